@@ -0,0 +1,85 @@
+"""
+Per-class cost of the day/time/date helpers in calendarmaker, before
+(regex + strptime on every call, the pre-lookup-table code kept below)
+and after (DAY_COMBOS / TIMES_12H tables, memoized date ranges).
+
+Run from schedule-parser-api/:
+    python -m benchmarks.daytime
+"""
+import re
+import timeit
+from datetime import datetime, timedelta
+
+import calendarmaker
+from textparser import parse_schedule_text, t
+
+# ---- the previous implementation, for comparison ----
+
+DAY_MAP = calendarmaker.DAY_MAP
+ICS_DAY_ORDER = calendarmaker.ICS_DAY_ORDER
+
+def old_parse_days_times(days_times_str):
+    m = re.match(r'^([A-Za-z]+)\s+(.*)$', days_times_str.strip())
+    if not m:
+        return [], None, None
+    days_part, time_part = m.groups()
+    i = 0
+    day_codes = []
+    while i < len(days_part):
+        day_codes.append(days_part[i : i+2])
+        i += 2
+    ics_days = [DAY_MAP.get(d,"") for d in day_codes if d in DAY_MAP]
+    tm = re.match(r'(.*)\s*-\s*(.*)', time_part)
+    if not tm:
+        return ics_days, None, None
+    start_str, end_str = tm.groups()
+    return ics_days, old_parse_time_12h(start_str), old_parse_time_12h(end_str)
+
+def old_parse_time_12h(tstr):
+    tstr = tstr.strip()
+    if re.match(r'^\d{1,2}:\d{2}(AM|PM)$', tstr):
+        tstr = tstr[:-2] + " " + tstr[-2:]
+        return datetime.strptime(tstr, "%I:%M %p").time()
+    return None
+
+def old_parse_start_end_dates(date_range_str):
+    m = re.match(r'(\d{2}/\d{2}/\d{4})\s*-\s*(\d{2}/\d{2}/\d{4})', date_range_str)
+    if not m:
+        return None, None
+    start_str, end_str = m.groups()
+    return (datetime.strptime(start_str, "%m/%d/%Y").date(),
+            datetime.strptime(end_str, "%m/%d/%Y").date())
+
+def old_align_earliest_day(start_date, ics_days):
+    earliest_d = min(ics_days, key=lambda d: ICS_DAY_ORDER.index(d))
+    PY_DAY_MAP = {"MO":0,"TU":1,"WE":2,"TH":3,"FR":4,"SA":5,"SU":6}
+    target_wd = PY_DAY_MAP[earliest_d]
+    current_wd = start_date.weekday()
+    if current_wd <= target_wd:
+        diff = target_wd - current_wd
+    else:
+        diff = 7 - (current_wd - target_wd)
+    return start_date + timedelta(days=diff)
+
+# ---- benchmark ----
+
+def per_class(parse_days_times, parse_start_end_dates, align_earliest_day, classes):
+    def run():
+        for cls_info in classes:
+            ics_days, start_t, end_t = parse_days_times(cls_info.days_times)
+            start_d, end_d = parse_start_end_dates(cls_info.start_end)
+            align_earliest_day(start_d, ics_days)
+    return run
+
+def main(number=2000):
+    classes = [c for course in parse_schedule_text(t, False) for c in course.classes]
+    old = per_class(old_parse_days_times, old_parse_start_end_dates, old_align_earliest_day, classes)
+    new = per_class(calendarmaker.parse_days_times, calendarmaker.parse_start_end_dates,
+                    calendarmaker.align_earliest_day, classes)
+
+    old_us = min(timeit.repeat(old, number=number, repeat=5)) / (number * len(classes)) * 1e6
+    new_us = min(timeit.repeat(new, number=number, repeat=5)) / (number * len(classes)) * 1e6
+    print(f"per class: before {old_us:.2f} us, after {new_us:.2f} us ({old_us / new_us:.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Startup import budget for the API module.
+
+Imports `main` in fresh interpreters under `python -X importtime` and fails
+(exit 1) when the best run takes longer than the budget, when a module
+that should only load lazily shows up at startup, or when the app's own
+share of a cold start (importing main with FastAPI/pydantic already loaded,
+then warm_worker's first render) is over APP_BUDGET_MS.
+tests/test_startup.py runs the same checks.
+
+Run from schedule-parser-api/:
+    python -m benchmarks.importtime                  # default budgets
+    python -m benchmarks.importtime --budget-ms 400 --top 15
+
+Like the benchmark baseline, the budgets are machine-specific: set them from
+a few runs on the machine (or CI runner) that does the checking.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+
+# whole `import main`, dominated by FastAPI and pydantic
+DEFAULT_BUDGET_MS = 1000
+# what the app adds on top of its framework, warm-up included: about 50 ms of
+# parser, calendar writer and cache modules; NumPy alone would add 80-100 ms
+APP_BUDGET_MS = 120
+FRAMEWORK_MODULES = ["fastapi", "fastapi.responses", "fastapi.middleware.cors", "pydantic",
+                     "starlette.concurrency", "anyio.to_thread"]
+# Only the legacy ics.py path, the dead dict-based helpers and optional
+# features (httpx: Google Calendar export, numpy: /freeTime) need these;
+# none may load just by importing the app.
+LAZY_MODULES = ["ics", "arrow", "tatsu", "localeventmaker", "numpy", "freetime", "pprint", "httpx"]
+
+
+def import_times(module="main"):
+    """
+    One fresh `python -X importtime -c "import <module>"`
+    => {module name: (self us, cumulative us)}.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+def app_startup():
+    """
+    One fresh interpreter => (ms to import main and run warm_worker with the
+    framework already imported, names of every module loaded by then).
+    """
+    code = (
+        f"import sys, time\n"
+        f"import {', '.join(FRAMEWORK_MODULES)}\n"
+        f"start = time.perf_counter()\n"
+        f"import main, pipeline\n"
+        f"pipeline.warm_worker()\n"
+        f"print((time.perf_counter() - start) * 1000)\n"
+        f"print(' '.join(sys.modules))\n"
+    )
+    proc = subprocess.run([sys.executable, "-c", code], cwd=APP_DIR, capture_output=True, text=True, check=True)
+    ms, modules = proc.stdout.splitlines()[-2:]
+    return float(ms), set(modules.split())
+
+def best_app_startup(runs=5):
+    """
+    Fastest of `runs` app_startup() calls => (ms, modules).
+    """
+    return min((app_startup() for _ in range(runs)), key=lambda r: r[0])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the import-time budget of main.py")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--app-budget-ms", type=float, default=APP_BUDGET_MS,
+                        help="import main + warm-up on top of FastAPI/pydantic")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters; the fastest counts")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules (self time) to list")
+    args = parser.parse_args(argv)
+
+    runs = [import_times() for _ in range(args.runs)]
+    best = min(runs, key=lambda t: t["main"][1])
+    total_ms = best["main"][1] / 1000
+
+    print(f"import main: {total_ms:.1f} ms (best of {args.runs}), budget {args.budget_ms:.0f} ms")
+    for name, (self_us, cumulative_us) in sorted(best.items(), key=lambda kv: -kv[1][0])[:args.top]:
+        print(f"  {self_us / 1000:>8.1f} ms self {cumulative_us / 1000:>8.1f} ms cumulative  {name}")
+
+    app_ms, warm_modules = best_app_startup(args.runs)
+    print(f"app startup (import + warm-up): {app_ms:.1f} ms (best of {args.runs}), budget {args.app_budget_ms:.0f} ms")
+
+    failed = False
+    eager = [m for m in LAZY_MODULES if m in best or m in warm_modules]
+    if eager:
+        print(f"FAIL: loaded at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: import main took {total_ms:.1f} ms > {args.budget_ms:.0f} ms")
+        failed = True
+    if app_ms > args.app_budget_ms:
+        print(f"FAIL: app startup took {app_ms:.1f} ms > {args.app_budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+Load-test harness and capacity report for the API server.
+
+`run` drives an already running server (e.g. the container) at a fixed
+concurrency and reports throughput, latency percentiles and error rate:
+
+    python -m benchmarks.loadtest run --url http://localhost:8000 --concurrency 32 --duration 20
+
+`sweep` starts the app locally with uvicorn for every combination of
+worker count and threadpool size, loads each one, and recommends a worker
+count (highest throughput whose p99 stays under --slo-ms with <1% errors):
+
+    python -m benchmarks.loadtest sweep --workers 1,2,4 --threadpool 40,100 --concurrency 64
+    python -m benchmarks.loadtest sweep --docker-image ucsctogcal-api   # same, inside the container
+
+Run from schedule-parser-api/. Request bodies are synthetic schedules from
+benchmarks/schedgen.py; --distinct controls how many different pastes are
+used (and so the cache hit rate).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.schedgen import generate_schedule
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(HERE)
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+def build_payloads(distinct, courses, seed=0):
+    rng = random.Random(seed)
+    return [
+        {"scheduleText": generate_schedule(rng.randint(max(1, courses // 2), courses), seed=seed + i),
+         "onlyEnrolledCourses": rng.random() < 0.5}
+        for i in range(distinct)
+    ]
+
+async def run_load(url, concurrency, duration, payloads, root_share=0.1, warmup=2.0):
+    """
+    `concurrency` clients looping for `duration` seconds (after `warmup`),
+    each request POST /parseSchedule or, with probability root_share, GET /.
+    """
+    samples = {"/parseSchedule": [], "/": []}
+    errors = {"/parseSchedule": 0, "/": 0}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30) as client:
+        start = time.perf_counter()
+        measure_from = start + warmup
+        stop_at = measure_from + duration
+
+        async def user(seed):
+            rng = random.Random(seed)
+            while True:
+                now = time.perf_counter()
+                if now >= stop_at:
+                    return
+                if rng.random() < root_share:
+                    path, req = "/", client.get("/")
+                else:
+                    path, req = "/parseSchedule", client.post("/parseSchedule", json=rng.choice(payloads))
+                t0 = time.perf_counter()
+                try:
+                    r = await req
+                    ok = r.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                t1 = time.perf_counter()
+                if t0 >= measure_from:
+                    if ok:
+                        samples[path].append(t1 - t0)
+                    else:
+                        errors[path] += 1
+
+        await asyncio.gather(*(user(i) for i in range(concurrency)))
+
+    report = {"concurrency": concurrency, "duration_s": duration, "endpoints": {}}
+    total_err = 0
+    for path, values in samples.items():
+        values.sort()
+        total_err += errors[path]
+        report["endpoints"][path] = summarize(values, errors[path], duration)
+    all_values = sorted(v for values in samples.values() for v in values)
+    report["total"] = summarize(all_values, total_err, duration)
+    return report
+
+def summarize(sorted_values, errors, duration):
+    n = len(sorted_values)
+    return {
+        "requests": n + errors,
+        "throughput_rps": n / duration,
+        "error_rate": errors / (n + errors) if n + errors else 0.0,
+        "p50_ms": percentile(sorted_values, 50) * 1e3,
+        "p90_ms": percentile(sorted_values, 90) * 1e3,
+        "p99_ms": percentile(sorted_values, 99) * 1e3,
+        "max_ms": (sorted_values[-1] if sorted_values else 0.0) * 1e3,
+        "mean_ms": (statistics.fmean(sorted_values) if sorted_values else 0.0) * 1e3,
+    }
+
+def print_report(report, label=""):
+    print(f"--- {label} concurrency={report['concurrency']} duration={report['duration_s']}s")
+    for path, s in list(report["endpoints"].items()) + [("total", report["total"])]:
+        print(f"{path:<15} {s['throughput_rps']:>8.1f} req/s  p50 {s['p50_ms']:>7.1f}  p90 {s['p90_ms']:>7.1f}"
+              f"  p99 {s['p99_ms']:>7.1f}  max {s['max_ms']:>7.1f} ms  errors {s['error_rate']:.2%}")
+
+# ---- local servers for the sweep ----
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def start_server(workers, threadpool, pipeline_workers, docker_image=None):
+    """
+    Start the app with uvicorn (locally or in the container) => (process, base url).
+    """
+    port = free_port()
+    env = {
+        "THREADPOOL_SIZE": str(threadpool),
+        "PIPELINE_WORKERS": str(pipeline_workers),
+    }
+    uvicorn_cmd = ["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000" if docker_image else str(port),
+                   "--workers", str(workers), "--log-level", "warning"]
+    if docker_image:
+        cmd = ["docker", "run", "--rm", "-p", f"{port}:8000"]
+        for k, v in env.items():
+            cmd += ["-e", f"{k}={v}"]
+        cmd += [docker_image] + uvicorn_cmd
+        proc = subprocess.Popen(cmd)
+    else:
+        proc = subprocess.Popen([sys.executable, "-m"] + uvicorn_cmd, cwd=APP_DIR, env={**os.environ, **env})
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(url + "/ready", timeout=1).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    proc.terminate()
+    raise RuntimeError(f"server with {workers} workers did not come up")
+
+def stop_server(proc):
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+def recommend(rows, slo_ms):
+    """
+    Best row: highest /parseSchedule throughput with p99 <= slo_ms and < 1% errors.
+    """
+    ok = [r for r in rows
+          if r["report"]["endpoints"]["/parseSchedule"]["p99_ms"] <= slo_ms
+          and r["report"]["total"]["error_rate"] < 0.01]
+    if not ok:
+        return None
+    return max(ok, key=lambda r: r["report"]["endpoints"]["/parseSchedule"]["throughput_rps"])
+
+def sweep(args, payloads):
+    cpus = os.cpu_count() or 1
+    rows = []
+    for workers in args.workers:
+        for threadpool in args.threadpool:
+            pipeline_workers = args.pipeline_workers or max(1, cpus // workers)
+            proc, url = start_server(workers, threadpool, pipeline_workers, args.docker_image)
+            try:
+                report = asyncio.run(run_load(url, args.concurrency, args.duration, payloads, args.root_share))
+            finally:
+                stop_server(proc)
+            label = f"workers={workers} threadpool={threadpool} pipeline_workers={pipeline_workers}"
+            print_report(report, label)
+            rows.append({"workers": workers, "threadpool": threadpool,
+                         "pipeline_workers": pipeline_workers, "report": report})
+
+    best = recommend(rows, args.slo_ms)
+    print("\n=== capacity report ===")
+    print(f"{'workers':>7} {'threads':>7} {'pool':>5} {'req/s':>8} {'p99 ms':>8} {'errors':>7}")
+    for r in rows:
+        s = r["report"]["endpoints"]["/parseSchedule"]
+        print(f"{r['workers']:>7} {r['threadpool']:>7} {r['pipeline_workers']:>5} {s['throughput_rps']:>8.1f}"
+              f" {s['p99_ms']:>8.1f} {r['report']['total']['error_rate']:>7.2%}")
+    if best:
+        s = best["report"]["endpoints"]["/parseSchedule"]
+        print(f"\nrecommended: --workers {best['workers']} (THREADPOOL_SIZE={best['threadpool']}, "
+              f"PIPELINE_WORKERS={best['pipeline_workers']}): ~{s['throughput_rps']:.0f} schedules/s "
+              f"per container at p99 {s['p99_ms']:.0f} ms")
+    else:
+        print(f"\nno configuration kept p99 under {args.slo_ms} ms with <1% errors; "
+              f"lower --concurrency or add containers")
+    return {"rows": rows, "recommended": best and {k: best[k] for k in ("workers", "threadpool", "pipeline_workers")}}
+
+def int_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the schedule parser API")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    def common(p):
+        p.add_argument("--concurrency", type=int, default=32, help="simultaneous clients")
+        p.add_argument("--duration", type=float, default=15, help="measured seconds per run")
+        p.add_argument("--distinct", type=int, default=200, help="different schedules to send")
+        p.add_argument("--courses", type=int, default=8, help="max courses per schedule")
+        p.add_argument("--root-share", type=float, default=0.1, help="fraction of requests to GET /")
+        p.add_argument("--output", help="write the JSON report here")
+
+    p_run = sub.add_parser("run", help="load a running server")
+    p_run.add_argument("--url", default="http://localhost:8000")
+    common(p_run)
+
+    p_sweep = sub.add_parser("sweep", help="start the app per configuration and compare")
+    p_sweep.add_argument("--workers", type=int_list, default=[1, 2, 4], help="e.g. 1,2,4")
+    p_sweep.add_argument("--threadpool", type=int_list, default=[40], help="AnyIO threadpool sizes, e.g. 20,40,100")
+    p_sweep.add_argument("--pipeline-workers", type=int, default=0,
+                         help="process pool size per worker (default: CPUs / workers)")
+    p_sweep.add_argument("--slo-ms", type=float, default=500, help="p99 target for the recommendation")
+    p_sweep.add_argument("--docker-image", help="run each configuration in this image instead of locally")
+    common(p_sweep)
+
+    args = parser.parse_args(argv)
+    payloads = build_payloads(args.distinct, args.courses)
+
+    if args.mode == "run":
+        result = asyncio.run(run_load(args.url, args.concurrency, args.duration, payloads, args.root_share))
+        print_report(result, args.url)
+    else:
+        result = sweep(args, payloads)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Synthetic UCSC schedule pastes for benchmarks.
+
+Produces text in the same layout as the real "My Class Schedule" copy
+(see textparser.t): course header, status block, then 7 lines per class,
+or with layout="columns"/"row" one line per class (see textparser.LAYOUTS).
+Varies course counts, lecture/discussion/lab sections, GE lines,
+dropped courses and TBA rows. Deterministic for a given seed.
+"""
+import random
+
+SUBJECTS = ["CSE", "MATH", "AM", "PHYS", "CHEM", "ECON", "LIT", "HIS", "BIOL", "STAT", "ECE", "PSYC"]
+WORDS = ["Intro", "Adv", "Programming", "Calculus", "Systems", "Design", "Theory", "Lab",
+         "Analysis", "Methods", "Writing", "Data", "Networks", "Modern", "World", "Project"]
+BUILDINGS = ["Media Theater M110", "Engineer 2 194", "Merrill Acad 102", "Soc Sci 2 075",
+             "ClassroomUnit 001", "Baskin Auditorium 101", "Thimann Lecture 003", "Kresge Clrm 327"]
+INSTRUCTORS = ["Ethan  Sifferman", "Richard K Jullig", "David Charles Harrison",
+               "Gerald Bennett Moulds", "To be Announced", "Maria L Chen", "Ana Ruiz"]
+GE_CODES = ["PR-E", "PR-C", "PR-S", "IM", "MF", "SI", "SR", "TA", "CC", "ER"]
+DAY_PATTERNS = ["MoWeFr", "TuTh", "MoWe", "We", "Tu", "Th", "Fr", "Mo", "MoTuWeTh"]
+TERMS = ["01/06/2025 - 03/14/2025", "03/31/2025 - 06/06/2025", "09/25/2025 - 12/05/2025"]
+STATUS_HEADER = "Status\tUnits\tGrading\tGrade\tDeadlines"
+STATUS_HEADER_GE = "Status\tUnits\tGrading\tGrade\tGeneral Education\tDeadlines"
+CLASS_HEADER = "Class Nbr\tSection\tComponent\tDays & Times\tRoom\tInstructor\tStart/End Date"
+
+
+def _time_range(rng):
+    start = rng.randrange(8 * 60, 19 * 60, 5)
+    end = start + rng.choice([65, 95, 120, 180])
+    return f"{_fmt(start)} - {_fmt(end)}"
+
+def _fmt(minutes):
+    h, m = divmod(minutes, 60)
+    ampm = "AM" if h < 12 else "PM"
+    return f"{(h - 1) % 12 + 1}:{m:02d}{ampm}"
+
+def _class_rows(rng, term, n_sections, tba_rate):
+    """
+    => [[class nbr, section, component, days & times, room, instructor, start/end], ...]
+    """
+    rows = []
+    components = ["Lecture"] + rng.choices(["Discussion", "Laboratory", "Seminar"], k=n_sections - 1)
+    for i, component in enumerate(components):
+        if rng.random() < tba_rate:
+            days_times, room = "TBA", "TBA"
+        else:
+            days_times, room = f"{rng.choice(DAY_PATTERNS)} {_time_range(rng)}", rng.choice(BUILDINGS)
+        section = "01" if i == 0 else f"01{chr(ord('A') + i - 1)}"
+        rows.append([
+            str(rng.randrange(10000, 99999)), section, component,
+            days_times, room, rng.choice(INSTRUCTORS), term,
+        ])
+    return rows
+
+def _layout_rows(rows, layout):
+    if layout == "stacked":
+        return [cell for row in rows for cell in row]
+    if layout == "columns":
+        return ["    ".join(row) for row in rows]
+    return [" ".join(row) for row in rows]
+
+def generate_schedule(n_courses=5, seed=0, dropped_rate=0.15, ge_rate=0.4, tba_rate=0.05, max_sections=3,
+                      layout="stacked"):
+    """
+    One pasted schedule with n_courses courses; layout is "stacked", "columns" or "row".
+    """
+    rng = random.Random(seed)
+    term = rng.choice(TERMS)
+    lines = []
+    for _ in range(n_courses):
+        code = f"{rng.choice(SUBJECTS)} {rng.randrange(1, 200)}{rng.choice(['', '', 'A', 'B', 'L'])}"
+        name = " ".join(rng.sample(WORDS, rng.randint(1, 3)))
+        has_ge = rng.random() < ge_rate
+        lines.extend([
+            f"{code} - {name}",
+            "\t\t",
+            STATUS_HEADER_GE if has_ge else STATUS_HEADER,
+            "Dropped" if rng.random() < dropped_rate else "Enrolled",
+            rng.choice(["5.00", "2.00", "1.00"]),
+            rng.choice(["Graded", "P/NP"]),
+            " ",
+        ])
+        if has_ge:
+            lines.append(rng.choice(GE_CODES))
+        lines.append("Academic Calendar Deadlines")
+        lines.append(CLASS_HEADER if layout == "stacked" else CLASS_HEADER.replace("\t", "    "))
+        lines.extend(_layout_rows(_class_rows(rng, term, rng.randint(1, max_sections), tba_rate), layout))
+    return "\n".join(lines)
+
+def generate_batch(n_schedules, courses_per_schedule=5, seed=0):
+    """
+    n_schedules different pastes, e.g. one per student.
+    """
+    return [generate_schedule(courses_per_schedule, seed=seed + i) for i in range(n_schedules)]
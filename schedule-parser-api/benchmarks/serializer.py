@@ -0,0 +1,49 @@
+"""
+ics.py (build_calendar + serialize_iter + TZID fix) vs icswriter.render_calendar.
+
+Run from schedule-parser-api/:
+    python -m benchmarks.serializer
+"""
+import time
+
+from calendarmaker import build_calendar
+from icswriter import render_calendar
+from textparser import parse_schedule_text, t
+
+SIZES = [1, 10, 10_000]
+
+def legacy_render(courses):
+    cal = build_calendar(courses)
+    return "".join(cal.serialize_iter()).replace(
+        ";TZID=AMERICA/LOS_ANGELES:", ";TZID=America/Los_Angeles:"
+    )
+
+def time_per_schedule(render, schedules, min_seconds=0.5):
+    """
+    Best-of-3 seconds per schedule, repeating small batches until they run long enough.
+    """
+    rounds = 1
+    while True:
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for courses in schedules:
+                    render(courses)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        if best >= min_seconds or len(schedules) * rounds >= 10_000:
+            return best / (rounds * len(schedules))
+        rounds *= 2
+
+def main():
+    courses = parse_schedule_text(t, False)
+    print(f"{'schedules':>10} {'ics.py us':>12} {'icswriter us':>14} {'speedup':>8}")
+    for n in SIZES:
+        schedules = [courses] * n
+        old = time_per_schedule(legacy_render, schedules)
+        new = time_per_schedule(render_calendar, schedules)
+        print(f"{n:>10} {old * 1e6:>12.1f} {new * 1e6:>14.1f} {old / new:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
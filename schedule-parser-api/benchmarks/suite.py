@@ -0,0 +1,192 @@
+"""
+Benchmark suite for parse -> events -> serialize -> /parseSchedule.
+
+Times each stage on synthetic schedules (benchmarks/schedgen.py), writes
+the results as JSON and compares them to a stored baseline, exiting
+non-zero when any benchmark got slower than the tolerance allows.
+
+Run from schedule-parser-api/:
+    python -m benchmarks.suite                       # run + compare to benchmarks/baseline.json
+    python -m benchmarks.suite --update-baseline     # run + store as the new baseline
+    python -m benchmarks.suite --output results.json --tolerance 0.3
+
+The stored baseline is machine-specific: regenerate it on the machine
+(or CI runner) that does the comparing.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+import httpx
+
+import pipeline
+from calendarmaker import build_calendar, iter_class_events
+from icswriter import render_calendar
+from main import app
+from textparser import iter_courses, parse_schedule_text
+
+from benchmarks.schedgen import generate_schedule
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+
+# name -> courses per pasted schedule
+SCENARIOS = {
+    "small": 4,
+    "typical": 8,
+    "history": 60,
+}
+# the other class table layouts, parsed at the "typical" size
+LAYOUTS = ("columns", "row")
+
+
+def measure(fn, min_time=0.2, repeat=5):
+    """
+    Median and min seconds per call of fn() over `repeat` rounds.
+    """
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= min_time / repeat or number >= 1 << 16:
+            break
+        number *= 2
+
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number)
+    return {"median_us": statistics.median(rounds) * 1e6, "min_us": min(rounds) * 1e6, "calls": number}
+
+def layout_benchmarks():
+    """
+    Parsing the same schedule pasted in each non-stacked layout
+    (compare with parse/typical for the stacked one).
+    """
+    results = {}
+    for layout in LAYOUTS:
+        text = generate_schedule(SCENARIOS["typical"], seed=42, layout=layout)
+        results[f"parse_{layout}/typical"] = measure(lambda: list(iter_courses(text)))
+    return results
+
+def stage_benchmarks(name, text):
+    courses = list(iter_courses(text))
+
+    def parse():
+        parse_schedule_text(text, False)
+
+    def events():
+        for course in courses:
+            for _ in iter_class_events(course):
+                pass
+
+    return {
+        f"parse/{name}": measure(parse),
+        f"events/{name}": measure(events),
+        f"serialize/{name}": measure(lambda: render_calendar(courses)),
+        f"serialize_icspy/{name}": measure(lambda: "".join(build_calendar(courses).serialize_iter())),
+    }
+
+async def endpoint_benchmarks(name, text, requests=50):
+    """
+    Full /parseSchedule through an in-process ASGI client:
+    cold = caches cleared before every request, warm = cache hits.
+    """
+    payload = {"scheduleText": text, "onlyEnrolledCourses": False}
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # start the worker pool outside the timings
+        (await client.post("/parseSchedule", json=payload)).raise_for_status()
+
+        for mode in ("cold", "warm"):
+            samples = []
+            for _ in range(requests):
+                if mode == "cold":
+                    pipeline.PARSED_CACHE.clear()
+                    pipeline.ICS_CACHE.clear()
+                start = time.perf_counter()
+                r = await client.post("/parseSchedule", json=payload)
+                samples.append(time.perf_counter() - start)
+                r.raise_for_status()
+            samples.sort()
+            results[f"endpoint_{mode}/{name}"] = {
+                "median_us": statistics.median(samples) * 1e6,
+                "min_us": samples[0] * 1e6,
+                "p95_us": samples[int(len(samples) * 0.95) - 1] * 1e6,
+                "calls": requests,
+            }
+    return results
+
+def run():
+    results = {}
+    for name, n_courses in SCENARIOS.items():
+        text = generate_schedule(n_courses, seed=42)
+        results.update(stage_benchmarks(name, text))
+        results.update(asyncio.run(endpoint_benchmarks(name, text)))
+    results.update(layout_benchmarks())
+    pipeline.shutdown_pool()
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+def compare(current, baseline, tolerance):
+    """
+    [(name, baseline_us, current_us)] for every benchmark whose best
+    round is more than `tolerance` (1.0 = 2x) slower than the baseline.
+    The min is compared rather than the median: it is far less noisy.
+    """
+    regressions = []
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur and cur["min_us"] > base["min_us"] * (1 + tolerance):
+            regressions.append((name, base["min_us"], cur["min_us"]))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=1.0,
+                        help="allowed slowdown vs. baseline before failing (default 1.0 = 2x)")
+    args = parser.parse_args(argv)
+
+    current = run()
+    for name, r in sorted(current["results"].items()):
+        print(f"{name:<28} {r['median_us']:>12.1f} us median {r['min_us']:>12.1f} us min")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(current, f, indent=2, sort_keys=True)
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --update-baseline first")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, args.tolerance)
+    for name, base, cur in regressions:
+        print(f"REGRESSION {name}: {base:.1f} us -> {cur:.1f} us")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
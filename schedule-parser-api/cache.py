@@ -0,0 +1,152 @@
+"""
+LRU + TTL result cache for parsed schedules and rendered calendars.
+
+Entries live in memory; pass a SqliteBackend to also keep them on disk
+so they survive restarts (and are shared between worker processes).
+"""
+import hashlib
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def normalize_schedule_text(text):
+    """
+    Whitespace-normalize a paste without changing how it parses:
+    outer whitespace, trailing whitespace and blank lines are dropped
+    ("\r\n" included), leading indentation is kept since it decides
+    whether a line can start a course. A bare "\r" ends a line, as in
+    textparser.normalize_paste.
+    """
+    lines = (ln.rstrip() for ln in text.strip().replace("\r\n", "\n").replace("\r", "\n").split("\n"))
+    return "\n".join(ln for ln in lines if ln)
+
+def schedule_key(text):
+    """
+    Content address of a pasted schedule, e.g. "3f1c...".
+    """
+    return hashlib.sha256(normalize_schedule_text(text).encode("utf-8")).hexdigest()
+
+
+class SqliteBackend:
+    """
+    On-disk second level for LRUCache: one table, values pickled.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " ns TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, expires REAL NOT NULL,"
+            " PRIMARY KEY (ns, key))"
+        )
+
+    def get(self, ns, key):
+        """
+        (value, expires) or None if missing/expired.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires FROM cache WHERE ns = ? AND key = ?", (ns, key)
+            ).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, ns, key, value, expires):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+                (ns, key, blob, expires),
+            )
+
+    def prune(self):
+        """
+        Drop expired rows.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with a max entry count and a per-entry TTL (seconds).
+    Cached values are shared between callers and must not be mutated.
+    """
+    # prune the disk backend once every this many sets
+    PRUNE_EVERY = 1000
+
+    def __init__(self, name, maxsize=1024, ttl=3600, backend=None):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._data = OrderedDict()  # key -> (value, expires)
+        self._lock = threading.Lock()
+        self._sets = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Cached value, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._data[key]
+
+        if self.backend is not None:
+            entry = self.backend.get(self.name, key)
+            if entry is not None:
+                with self._lock:
+                    self.hits += 1
+                    self._store(key, entry)
+                return entry[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value):
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._store(key, (value, expires))
+            self._sets += 1
+            prune = self._sets % self.PRUNE_EVERY == 0
+        if self.backend is not None:
+            self.backend.set(self.name, key, value, expires)
+            if prune:
+                self.backend.prune()
+
+    def _store(self, key, entry):
+        # caller holds the lock
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
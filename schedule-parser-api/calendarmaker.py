@@ -1,7 +1,13 @@
+import itertools
 import re
 from datetime import datetime, time, timedelta
-from ics import Calendar, Event
-from ics.grammar.parse import ContentLine
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+# ics.py (and arrow/TatSu under it) is only needed by the legacy
+# build_calendar path; the request path writes ICS with icswriter.
+if TYPE_CHECKING:
+    from ics import Calendar
 
 DAY_MAP = {
     "Mo": "MO",
@@ -15,6 +21,65 @@ DAY_MAP = {
 
 # For ordering if the user typed "WeFrMo" etc.:
 ICS_DAY_ORDER = ["MO","TU","WE","TH","FR","SA","SU"]
+# We'll map to Python's Monday=0..Sunday=6
+PY_DAY_MAP = {"MO":0,"TU":1,"WE":2,"TH":3,"FR":4,"SA":5,"SU":6}
+
+DAYS_TIMES_RE = re.compile(r'^([A-Za-z]+)\s+(.*)$')
+TIME_RANGE_RE = re.compile(r'(.*)\s*-\s*(.*)')
+TIME_12H_RE = re.compile(r'^\d{1,2}:\d{2}(AM|PM)$')
+DATE_RANGE_RE = re.compile(r'(\d{2}/\d{2}/\d{4})\s*-\s*(\d{2}/\d{2}/\d{4})')
+
+def _build_day_combos():
+    """
+    Every in-order day combination => (ICS days, earliest Python weekday),
+    e.g. "MoWeFr" => (("MO","WE","FR"), 0). 127 entries.
+    """
+    table = {}
+    for n in range(1, len(DAY_MAP) + 1):
+        for combo in itertools.combinations(DAY_MAP, n):
+            ics_days = tuple(DAY_MAP[d] for d in combo)
+            table["".join(combo)] = (ics_days, PY_DAY_MAP[ics_days[0]])
+    return table
+
+def _build_times_12h():
+    """
+    Every valid "H:MMAM"/"HH:MMPM" string => time, e.g. "4:00PM" => time(16,0).
+    """
+    table = {}
+    for hour in range(1, 13):
+        for minute in range(60):
+            for ampm, offset in (("AM", 0), ("PM", 12)):
+                t = time(hour % 12 + offset, minute)
+                table[f"{hour}:{minute:02d}{ampm}"] = t
+                table[f"{hour:02d}:{minute:02d}{ampm}"] = t
+    return table
+
+DAY_COMBOS = _build_day_combos()
+TIMES_12H = _build_times_12h()
+# earliest Python weekday for each in-order BYDAY tuple, e.g. ("MO","WE") => 0
+EARLIEST_WEEKDAY = {days: wd for days, wd in DAY_COMBOS.values()}
+
+# Standard VTIMEZONE block for "America/Los_Angeles", one content line per entry.
+VTIMEZONE_LINES = [
+    "BEGIN:VTIMEZONE",
+    "TZID:America/Los_Angeles",
+    "X-LIC-LOCATION:America/Los_Angeles",
+    "BEGIN:DAYLIGHT",
+    "TZOFFSETFROM:-0800",
+    "TZOFFSETTO:-0700",
+    "TZNAME:PDT",
+    "DTSTART:19700308T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=2SU",
+    "END:DAYLIGHT",
+    "BEGIN:STANDARD",
+    "TZOFFSETFROM:-0700",
+    "TZOFFSETTO:-0800",
+    "TZNAME:PST",
+    "DTSTART:19701101T020000",
+    "RRULE:FREQ=YEARLY;BYMONTH=11;BYDAY=1SU",
+    "END:STANDARD",
+    "END:VTIMEZONE"
+]
 
 def parse_days_times(days_times_str):
     """
@@ -22,24 +87,17 @@ def parse_days_times(days_times_str):
     => (["MO","WE","FR"], time(16,0), time(17,5))
     """
     # 1) Separate "MoWeFr" from "4:00PM - 5:05PM"
-    m = re.match(r'^([A-Za-z]+)\s+(.*)$', days_times_str.strip())
+    m = DAYS_TIMES_RE.match(days_times_str.strip())
     if not m:
         return [], None, None
     days_part, time_part = m.groups()
 
-    # 2) e.g. "MoWeFr" -> ["Mo","We","Fr"]
-    i = 0
-    day_codes = []
-    while i < len(days_part):
-        chunk = days_part[i : i+2]
-        day_codes.append(chunk)
-        i += 2
-
-    # Convert ["Mo","We","Fr"] -> ["MO","WE","FR"]
-    ics_days = [DAY_MAP.get(d,"") for d in day_codes if d in DAY_MAP]
+    # 2) e.g. "MoWeFr" -> ["MO","WE","FR"]; table hit for every in-order combo
+    combo = DAY_COMBOS.get(days_part)
+    ics_days = list(combo[0]) if combo else parse_day_codes(days_part)
 
     # 3) parse the time range "4:00PM - 5:05PM"
-    tm = re.match(r'(.*)\s*-\s*(.*)', time_part)
+    tm = TIME_RANGE_RE.match(time_part)
     if not tm:
         return ics_days, None, None
     start_str, end_str = tm.groups()
@@ -48,24 +106,38 @@ def parse_days_times(days_times_str):
     end_t   = parse_time_12h(end_str)
     return ics_days, start_t, end_t
 
+def parse_day_codes(days_part):
+    """
+    Slow path for day strings not in DAY_COMBOS (e.g. "WeFrMo", "TBA"):
+    "WeFrMo" -> ["We","Fr","Mo"] -> ["WE","FR","MO"], unknown codes dropped.
+    """
+    day_codes = [days_part[i : i+2] for i in range(0, len(days_part), 2)]
+    return [DAY_MAP[d] for d in day_codes if d in DAY_MAP]
+
 def parse_time_12h(tstr):
     """
     e.g. "4:00PM" => time(16,0)
     """
     tstr = tstr.strip()
+    t = TIMES_12H.get(tstr)
+    if t is not None:
+        return t
+    # Not in the table: strptime keeps the old behaviour (e.g. ValueError for "13:00PM").
     # Insert a space => "4:00PM" -> "4:00 PM"
-    if re.match(r'^\d{1,2}:\d{2}(AM|PM)$', tstr):
+    if TIME_12H_RE.match(tstr):
         tstr = tstr[:-2] + " " + tstr[-2:]
         dt = datetime.strptime(tstr, "%I:%M %p")
         return dt.time()
     return None
 
+@lru_cache(maxsize=256)
 def parse_start_end_dates(date_range_str):
     """
     e.g. "01/06/2025 - 03/14/2025"
     => (date(2025,1,6), date(2025,3,14))
+    Memoized: a whole paste usually shares one or two term ranges.
     """
-    m = re.match(r'(\d{2}/\d{2}/\d{4})\s*-\s*(\d{2}/\d{2}/\d{4})', date_range_str)
+    m = DATE_RANGE_RE.match(date_range_str)
     if not m:
         return None, None
     start_str, end_str = m.groups()
@@ -79,39 +151,36 @@ def align_earliest_day(start_date, ics_days):
     pick the earliest day by ICS_DAY_ORDER => "MO"
     shift start_date forward to that day.
     """
-    # e.g. earliest_d = "MO"
-    earliest_d = min(ics_days, key=lambda d: ICS_DAY_ORDER.index(d))
+    target_wd = EARLIEST_WEEKDAY.get(tuple(ics_days))
+    if target_wd is None:
+        # out-of-order days, e.g. ["WE","MO"]
+        target_wd = min(PY_DAY_MAP[d] for d in ics_days)
+    return start_date + timedelta(days=(target_wd - start_date.weekday()) % 7)
 
-    # We'll map to Python's Monday=0..Sunday=6
-    PY_DAY_MAP = {"MO":0,"TU":1,"WE":2,"TH":3,"FR":4,"SA":5,"SU":6}
-    target_wd = PY_DAY_MAP[earliest_d]
-    current_wd = start_date.weekday()
-    if current_wd <= target_wd:
-        diff = target_wd - current_wd
-    else:
-        diff = 7 - (current_wd - target_wd)
-    return start_date + timedelta(days=diff) 
+def ics_date(d):
+    """
+    date(2025,1,6) => "20250106" (several times cheaper than strftime)
+    """
+    return f"{d.year:04d}{d.month:02d}{d.day:02d}"
 
-def create_multi_day_event(course):
+def iter_class_events(course):
     """
-    Creates one recurring event per "class" 
-    if it meets multiple days (MoWeFr). 
-    - Align earliest day 
-    - Build local date/time 
-    - Add BYDAY=MO,WE,FR etc.
+    Yields the plain fields of one recurring event per "class"
+    (e.g. MoWeFr lecture => one event with BYDAY=MO,WE,FR).
+    Classes with missing days/times/dates are skipped.
+    Shared by create_multi_day_event (ics.py) and icswriter (fast path).
     """
-    events = []
-    title = course.get("title","Untitled Course")
-
-    # Each "classes" entry might be "MoWeFr 4:00PM - 5:05PM" + room, instructor, ...
-    for cls_info in course["classes"]:
-        dt_str = cls_info.get("days_times","")
-        se_str = cls_info.get("start_end","")
-        room   = cls_info.get("room","")
-        instr  = cls_info.get("instructor","")
-        comp   = cls_info.get("component","")
-        sect   = cls_info.get("section","")
-        cnum   = cls_info.get("class_nbr","")
+    title = course.title or "Untitled Course"
+
+    # Each ClassInfo might be "MoWeFr 4:00PM - 5:05PM" + room, instructor, ...
+    for cls_info in course.classes:
+        dt_str = cls_info.days_times
+        se_str = cls_info.start_end
+        room   = cls_info.room
+        instr  = cls_info.instructor
+        comp   = cls_info.component
+        sect   = cls_info.section
+        cnum   = cls_info.class_nbr
 
         ics_days, start_t, end_t = parse_days_times(dt_str)
         start_d, end_d = parse_start_end_dates(se_str)
@@ -126,19 +195,49 @@ def create_multi_day_event(course):
         # shift start_date to the earliest ICS day
         aligned_start = align_earliest_day(start_d, ics_days)
 
-        # build naive local datetimes
-        dt_begin = datetime.combine(aligned_start, start_t)
-        dt_end   = datetime.combine(aligned_start, end_t)
+        # naive local date/times, ICS format e.g. "20250106T160000"
+        day_str = ics_date(aligned_start)
+
+        # The RRULE => "FREQ=WEEKLY;BYDAY=MO,WE,FR;UNTIL=..."
+        term_end = ics_date(end_d)
+        until_utc = f"{term_end}T235900Z"
 
-        # Convert to ICS format e.g. "20250106T160000"
-        begin_str = dt_begin.strftime("%Y%m%dT%H%M%S")
-        end_str   = dt_end.strftime("%Y%m%dT%H%M%S")
+        yield {
+            # identity of the meeting, used for stable UIDs
+            "class_nbr": cnum,
+            "section": sect,
+            "term_start": ics_date(start_d),
+            "term_end": term_end,
+            "byday": byday_str,
+            "summary": f"{title} ({comp} {sect})",
+            "description": f"Instructor: {instr}\nClass Number: {cnum}",
+            "location": room,
+            # local to America/Los_Angeles
+            "dtstart": f"{day_str}T{start_t.hour:02d}{start_t.minute:02d}00",
+            "dtend": f"{day_str}T{end_t.hour:02d}{end_t.minute:02d}00",
+            "rrule": f"FREQ=WEEKLY;BYDAY={byday_str};UNTIL={until_utc}",
+        }
 
+def create_multi_day_event(course):
+    """
+    Creates one recurring ics.py Event per "class" 
+    if it meets multiple days (MoWeFr). 
+    - Align earliest day 
+    - Build local date/time 
+    - Add BYDAY=MO,WE,FR etc.
+    - EXDATE the meetings on academic holidays (occurrences.py)
+    """
+    from ics import Event
+    from ics.grammar.parse import ContentLine
+    from occurrences import with_exdates
+
+    events = []
+    for fields in with_exdates(list(iter_class_events(course))):
         # Create single event
         e = Event()
-        e.name        = f"{title} ({comp} {sect})"
-        e.description = f"Instructor: {instr}\nClass Number: {cnum}"
-        e.location    = room
+        e.name        = fields["summary"]
+        e.description = fields["description"]
+        e.location    = fields["location"]
 
         # # FIXING THE END TIME ISSUE
         # e.begin = dt_begin
@@ -147,48 +246,33 @@ def create_multi_day_event(course):
         # Instead of e.begin/e.end, write lines with TZID=America/Los_Angeles
         e.extra.append(ContentLine(
             name="DTSTART;TZID=America/Los_Angeles",
-            value=begin_str
+            value=fields["dtstart"]
         ))
         e.extra.append(ContentLine(
             name="DTEND;TZID=America/Los_Angeles",
-            value=end_str
+            value=fields["dtend"]
         ))
-
-        # The RRULE => "FREQ=WEEKLY;BYDAY=MO,WE,FR;UNTIL=..."
-        until_utc = end_d.strftime("%Y%m%dT235900Z")
         e.extra.append(ContentLine(
             name="RRULE",
-            value=f"FREQ=WEEKLY;BYDAY={byday_str};UNTIL={until_utc}"
+            value=fields["rrule"]
         ))
+        # no class on academic holidays
+        if "exdate" in fields:
+            e.extra.append(ContentLine(
+                name="EXDATE;TZID=America/Los_Angeles",
+                value=",".join(fields["exdate"])
+            ))
 
         events.append(e)
     return events
 
-def add_vtimezone_block(cal: Calendar):
+def add_vtimezone_block(cal: "Calendar"):
     """
     Insert a standard VTIMEZONE block for "America/Los_Angeles".
     """
-    lines = [
-        "BEGIN:VTIMEZONE",
-        "TZID:America/Los_Angeles",
-        "X-LIC-LOCATION:America/Los_Angeles",
-        "BEGIN:DAYLIGHT",
-        "TZOFFSETFROM:-0800",
-        "TZOFFSETTO:-0700",
-        "TZNAME:PDT",
-        "DTSTART:19700308T020000",
-        "RRULE:FREQ=YEARLY;BYMONTH=3;BYDAY=2SU",
-        "END:DAYLIGHT",
-        "BEGIN:STANDARD",
-        "TZOFFSETFROM:-0700",
-        "TZOFFSETTO:-0800",
-        "TZNAME:PST",
-        "DTSTART:19701101T020000",
-        "RRULE:FREQ=YEARLY;BYMONTH=11;BYDAY=1SU",
-        "END:STANDARD",
-        "END:VTIMEZONE"
-    ]
-    for i in lines:
+    from ics.grammar.parse import ContentLine
+
+    for i in VTIMEZONE_LINES:
         cal.extra.append(
             ContentLine(name=i.split(":")[0], value=i.split(":")[1])
         )
@@ -200,6 +284,8 @@ def build_calendar(courses):
     - For each course, create single multi-day events
     - Insert VTIMEZONE for LA
     """
+    from ics import Calendar
+
     cal = Calendar()
     add_vtimezone_block(cal)
 
@@ -0,0 +1,231 @@
+"""
+Term catalog: class number => canonical course and meeting, looked up in O(1).
+
+Built once from a CSV dump of the term's schedule of classes, with columns
+    class_nbr,code,name,section,component,days_times,room,instructor,start_end
+e.g. 30481,CSE 111,Adv Programming,01,Lecture,MoWeFr 4:00PM - 5:05PM,Media Theater M110,Ethan  Sifferman,01/06/2025 - 03/14/2025
+
+    python catalog.py build fall2025.csv fall2025.idx
+    python catalog.py get fall2025.idx 30481
+
+into a compact file that is memory-mapped rather than loaded, so every
+worker process shares the same pages:
+
+    header   "SCHCAT01", first class number, slot count, records offset, strings offset (<8sIIII)
+    slots    one uint32 per class number from first to last: record index + 1, or 0
+    records  8 uint32 string offsets per class (code, name, section, ..., start_end)
+    strings  deduplicated UTF-8, each prefixed by its uint16 length
+
+Set CATALOG_PATH to use it: the parser then resolves single-line rows that
+match the catalog's class (Catalog.validate) by class number instead of
+guessing where the room ends and the instructor starts, and a bare list of
+class numbers becomes a valid paste.
+"""
+import csv
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+from records import ClassInfo, Course, CourseMetadata
+
+CATALOG_PATH = os.environ.get("CATALOG_PATH")
+
+MAGIC = b"SCHCAT01"
+HEADER = struct.Struct("<8sIIII")
+SLOT = struct.Struct("<I")
+FIELDS = ("code", "name", "section", "component", "days_times", "room", "instructor", "start_end")
+RECORD = struct.Struct("<" + "I" * len(FIELDS))
+STRING_LEN = struct.Struct("<H")
+
+_catalog = None
+_loaded = False
+
+
+class CatalogError(Exception):
+    pass
+
+
+class Catalog:
+    """
+    Read-only view of a catalog file.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            st = os.fstat(f.fileno())
+        magic, self.first, self.slots, self._records, self._strings = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise CatalogError(f"{path} is not a catalog file")
+        # of the mapped file (a rebuild swaps in a new one), e.g. "5d41402abc4b"
+        ident = f"{os.path.realpath(path)}:{st.st_size}:{st.st_mtime_ns}:".encode() + self._mm[:HEADER.size]
+        self.fingerprint = hashlib.sha1(ident).hexdigest()[:12]
+
+    def _record(self, class_nbr):
+        i = class_nbr - self.first
+        if not 0 <= i < self.slots:
+            return None
+        rec = SLOT.unpack_from(self._mm, HEADER.size + i * SLOT.size)[0]
+        if not rec:
+            return None
+        return RECORD.unpack_from(self._mm, self._records + (rec - 1) * RECORD.size)
+
+    def _string(self, offset):
+        start = self._strings + offset
+        (n,) = STRING_LEN.unpack_from(self._mm, start)
+        return self._mm[start + 2:start + 2 + n].decode("utf-8")
+
+    def get(self, class_nbr):
+        """
+        e.g. get("30481") => {"class_nbr": "30481", "code": "CSE 111", "name": ..., ...} or None
+        """
+        try:
+            record = self._record(int(class_nbr))
+        except ValueError:
+            return None
+        if record is None:
+            return None
+        entry = {"class_nbr": str(class_nbr).strip()}
+        for field, offset in zip(FIELDS, record):
+            entry[field] = self._string(offset)
+        return entry
+
+    def __contains__(self, class_nbr):
+        try:
+            return self._record(int(class_nbr)) is not None
+        except ValueError:
+            return False
+
+    def class_info(self, class_nbr):
+        """
+        => canonical ClassInfo for a class number, or None
+        """
+        entry = self.get(class_nbr)
+        if entry is None:
+            return None
+        return ClassInfo(entry["class_nbr"], entry["section"], entry["component"], entry["days_times"],
+                         entry["room"], entry["instructor"], entry["start_end"])
+
+    def validate(self, cls):
+        """
+        Fields of a parsed ClassInfo that disagree with the catalog
+        (None if the class number is unknown), e.g. ["room"].
+        """
+        canonical = self.class_info(cls.class_nbr)
+        if canonical is None:
+            return None
+        return [f for f in ClassInfo.__slots__ if getattr(cls, f) != getattr(canonical, f)]
+
+    def courses(self, class_numbers):
+        """
+        Class numbers => Course records, one per course code in first-seen
+        order, status "Enrolled". Unknown numbers are skipped.
+        """
+        grouped = {}
+        for nbr in class_numbers:
+            entry = self.get(nbr)
+            if entry is None:
+                continue
+            key = (entry["code"], entry["name"])
+            grouped.setdefault(key, []).append(self.class_info(nbr))
+        return [
+            Course(
+                title=f"{code} - {name}" if name else code,
+                code=code,
+                name=name,
+                metadata=CourseMetadata(status="Enrolled"),
+                classes=tuple(classes),
+            )
+            for (code, name), classes in grouped.items()
+        ]
+
+
+def get_catalog():
+    """
+    The catalog at CATALOG_PATH, mapped on first use (None when unset).
+    """
+    global _catalog, _loaded
+    if not _loaded:
+        _catalog = Catalog(CATALOG_PATH) if CATALOG_PATH else None
+        _loaded = True
+    return _catalog
+
+def catalog_fingerprint():
+    """
+    Catalog.fingerprint of the loaded catalog, or "none"; parsed results
+    depend on it, so it is part of their cache keys and ETags.
+    """
+    catalog = get_catalog()
+    return catalog.fingerprint if catalog is not None else "none"
+
+def set_catalog(catalog):
+    global _catalog, _loaded
+    _catalog = catalog
+    _loaded = True
+
+def build_catalog(csv_path, out_path):
+    """
+    CSV dump => catalog file. Returns the number of classes written.
+    """
+    rows = {}
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for line_no, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                nbr = int(row["class_nbr"])
+                values = [(row.get(field) or "").strip() for field in FIELDS]
+            except (KeyError, ValueError) as e:
+                raise CatalogError(f"{csv_path}:{line_no}: bad row ({e})")
+            rows[nbr] = values
+    if not rows:
+        raise CatalogError(f"{csv_path} has no classes")
+
+    strings = {}
+    pool = bytearray()
+
+    def intern(value):
+        offset = strings.get(value)
+        if offset is None:
+            data = value.encode("utf-8")
+            offset = strings[value] = len(pool)
+            pool.extend(STRING_LEN.pack(len(data)))
+            pool.extend(data)
+        return offset
+
+    first, last = min(rows), max(rows)
+    slots = bytearray(SLOT.size * (last - first + 1))
+    records = bytearray()
+    for i, nbr in enumerate(sorted(rows), start=1):
+        SLOT.pack_into(slots, (nbr - first) * SLOT.size, i)
+        records.extend(RECORD.pack(*(intern(v) for v in rows[nbr])))
+
+    records_offset = HEADER.size + len(slots)
+    strings_offset = records_offset + len(records)
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, first, last - first + 1, records_offset, strings_offset))
+        f.write(slots)
+        f.write(records)
+        f.write(pool)
+    # atomic swap, so running workers never map a half-written file
+    os.replace(tmp_path, out_path)
+    return len(rows)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 3 and argv[0] == "build":
+        n = build_catalog(argv[1], argv[2])
+        print(f"{argv[2]}: {n} classes, {os.path.getsize(argv[2])} bytes")
+        return 0
+    if len(argv) >= 3 and argv[0] == "get":
+        catalog = Catalog(argv[1])
+        for nbr in argv[2:]:
+            print(catalog.get(nbr))
+        return 0
+    print("usage: python catalog.py build <dump.csv> <catalog.idx>\n"
+          "       python catalog.py get <catalog.idx> <class_nbr>...", file=sys.stderr)
+    return 2
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Time conflicts between the classes of a parsed schedule.
+
+Every meeting is an interval [start, end) in minutes on one weekday, valid
+between the class's term start and end dates. Meetings are bucketed per
+weekday and swept in start order while keeping only the ones still in
+progress, so checking a schedule costs O(n log n + conflicts) rather than
+comparing every pair of classes.
+
+Two classes conflict when they meet on the same weekday, their times overlap
+and their date ranges overlap; back-to-back classes (4:00PM - 5:05PM and
+5:05PM - 6:10PM) don't. TBA and unparseable classes are ignored, and so are
+courses left out of the calendar (see schedulediff.in_calendar) or Dropped.
+"""
+from operator import itemgetter
+
+from calendarmaker import ICS_DAY_ORDER, parse_days_times, parse_start_end_dates
+from schedulediff import in_calendar
+
+
+def minutes(t):
+    return t.hour * 60 + t.minute
+
+def hhmm(m):
+    """
+    e.g. 1040 => "17:20"
+    """
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+def class_meetings(courses, only_enrolled=False):
+    """
+    Courses => {"MO": [(start, end, first day, last day, course, class), ...], ...}
+    with start/end in minutes after midnight.
+    """
+    by_day = {}
+    for course in courses:
+        if not in_calendar(course, only_enrolled) or course.metadata.status == "Dropped":
+            continue
+        for cls in course.classes:
+            days, start_t, end_t = parse_days_times(cls.days_times)
+            first, last = parse_start_end_dates(cls.start_end)
+            if not days or not start_t or not end_t or not first or not last:
+                continue
+            start, end = minutes(start_t), minutes(end_t)
+            if end <= start:
+                continue
+            for day in days:
+                by_day.setdefault(day, []).append((start, end, first, last, course, cls))
+    return by_day
+
+def describe(course, cls):
+    return {
+        "class_nbr": cls.class_nbr,
+        "section": cls.section,
+        "summary": f"{course.title or 'Untitled Course'} ({cls.component} {cls.section})",
+        "days_times": cls.days_times,
+    }
+
+def find_conflicts(courses, only_enrolled=False):
+    """
+    Courses => one entry per pair of overlapping classes, e.g.
+    [{"classes": [{"class_nbr": "30476", ...}, {"class_nbr": "32158", ...}],
+      "days": ["TU", "TH"], "start": "12:30", "end": "13:15"}]
+    where start/end bound the overlap.
+    """
+    found = {}
+    by_day = class_meetings(courses, only_enrolled)
+    for day in ICS_DAY_ORDER:
+        meetings = by_day.get(day)
+        if not meetings:
+            continue
+        meetings.sort(key=itemgetter(0))
+        active = []
+        for meeting in meetings:
+            start, end, first, last, course, cls = meeting
+            # drop whatever ended by now; what is left overlaps this meeting in time
+            active = [m for m in active if m[1] > start]
+            for other in active:
+                other_cls = other[5]
+                if (other_cls.class_nbr, other_cls.section) == (cls.class_nbr, cls.section):
+                    # the same class pasted twice
+                    continue
+                if other[2] > last or first > other[3]:
+                    # different terms
+                    continue
+                pair = tuple(sorted([(other_cls.class_nbr, other_cls.section), (cls.class_nbr, cls.section)]))
+                conflict = found.get(pair)
+                if conflict is None:
+                    a, b = sorted([(other[4], other_cls), (course, cls)], key=lambda c: (c[1].class_nbr, c[1].section))
+                    conflict = found[pair] = {
+                        "classes": [describe(*a), describe(*b)],
+                        "days": [],
+                        "start": hhmm(max(start, other[0])),
+                        "end": hhmm(min(end, other[1])),
+                    }
+                if day not in conflict["days"]:
+                    conflict["days"].append(day)
+            active.append(meeting)
+    return list(found.values())
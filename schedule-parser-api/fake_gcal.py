@@ -0,0 +1,121 @@
+"""
+Local stand-in for the Google Calendar API, for trying gcal.py without Google.
+
+Implements events get/update/insert/delete/list and the multipart/mixed
+batch endpoint, keeping events in memory per calendar. Any bearer token
+is accepted except "invalid"; event ids must be base32hex like Google's.
+
+    uvicorn fake_gcal:app --port 8081
+    GCAL_API_BASE=http://localhost:8081 uvicorn main:app
+
+or in-process: httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_gcal.app)).
+"""
+import json
+import re
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+app = FastAPI()
+
+# calendar id -> event id -> event resource
+CALENDARS = {}
+EVENT_ID_RE = re.compile(r'^[a-v0-9]{5,1024}$')
+EVENTS_PATH_RE = re.compile(r'^/calendar/v3/calendars/([^/]+)/events(?:/([^/?]+))?$')
+
+
+def error(status, message):
+    return status, {"error": {"code": status, "message": message}}
+
+def handle(method, path, body):
+    """
+    One Calendar API call => (status, JSON body or None).
+    """
+    m = EVENTS_PATH_RE.match(path.split("?")[0])
+    if not m:
+        return error(404, "Not Found")
+    events = CALENDARS.setdefault(m.group(1), {})
+    event_id = m.group(2)
+
+    if event_id is None:
+        if method == "GET":
+            return 200, {"kind": "calendar#events", "items": list(events.values())}
+        if method == "POST":
+            event_id = body.get("id") or uuid.uuid4().hex
+            if not EVENT_ID_RE.match(event_id):
+                return error(400, "Invalid resource id value.")
+            if event_id in events:
+                return error(409, "The requested identifier already exists.")
+            events[event_id] = {**body, "id": event_id, "sequence": 0}
+            return 200, events[event_id]
+        return error(405, "Method Not Allowed")
+
+    event = events.get(event_id)
+    if method == "GET":
+        return (200, event) if event else error(404, "Not Found")
+    if method in ("PUT", "PATCH"):
+        if event is None:
+            return error(404, "Not Found")
+        merged = {**event, **body} if method == "PATCH" else {**body}
+        events[event_id] = {**merged, "id": event_id, "sequence": event["sequence"] + 1}
+        return 200, events[event_id]
+    if method == "DELETE":
+        if event is None:
+            return error(410, "Resource has been deleted")
+        del events[event_id]
+        return 204, None
+    return error(405, "Method Not Allowed")
+
+def authorized(request):
+    auth = request.headers.get("authorization", "")
+    return auth.startswith("Bearer ") and auth[7:] not in ("", "invalid")
+
+def unauthorized():
+    return JSONResponse(error(401, "Invalid Credentials")[1], status_code=401)
+
+@app.post("/batch/calendar/v3")
+async def batch(request: Request):
+    if not authorized(request):
+        return unauthorized()
+    content_type = request.headers.get("content-type", "")
+    boundary = content_type.split("boundary=", 1)[-1].strip('"')
+    text = (await request.body()).decode()
+
+    out_boundary = "batch_" + uuid.uuid4().hex
+    parts = []
+    for part in text.split(f"--{boundary}")[1:]:
+        if part.startswith("--"):
+            break
+        outer, _, inner = part.strip("\r\n").partition("\r\n\r\n")
+        content_id = ""
+        for line in outer.splitlines():
+            if line.lower().startswith("content-id:"):
+                content_id = line.split(":", 1)[1].strip().strip("<>")
+        request_line, _, rest = inner.partition("\r\n")
+        method, path, _ = request_line.split(" ", 2)
+        _, _, body = rest.partition("\r\n\r\n")
+        status, result = handle(method, path, json.loads(body) if body.strip() else None)
+        payload = json.dumps(result) if result is not None else ""
+        parts.append("\r\n".join([
+            f"--{out_boundary}",
+            "Content-Type: application/http",
+            f"Content-ID: <response-{content_id}>",
+            "",
+            f"HTTP/1.1 {status} {'OK' if status < 400 else 'Error'}",
+            "Content-Type: application/json; charset=UTF-8",
+            "",
+            payload,
+        ]))
+    content = "\r\n".join(parts) + f"\r\n--{out_boundary}--\r\n"
+    return Response(content=content, media_type=f"multipart/mixed; boundary={out_boundary}")
+
+@app.api_route("/calendar/v3/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
+async def single(request: Request, path: str):
+    if not authorized(request):
+        return unauthorized()
+    raw = await request.body()
+    status, result = handle(request.method, f"/calendar/v3/{path}", json.loads(raw) if raw else None)
+    if result is None:
+        return Response(status_code=status)
+    return JSONResponse(result, status_code=status)
@@ -0,0 +1,137 @@
+"""
+Storage for subscribable calendar feeds (GET /calendar/{token}.ics).
+
+A feed is a pasted schedule saved under a random, unguessable token. Only
+the paste is stored: serving a feed goes through pipeline's caches like
+any /parseSchedule request, so a poll for an unchanged feed is a row
+lookup plus a 304, or an ICS_CACHE hit.
+
+FEED_STORE picks the backend:
+    sqlite:///path/to/feeds.db   (default: sqlite:///feeds.db)
+    memory                       (per process; for development)
+Any object with get/put like the classes below can be plugged in via set_store().
+"""
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+FEED_STORE = os.environ.get("FEED_STORE", "sqlite:///feeds.db")
+
+_store = None
+
+
+@dataclass(frozen=True, slots=True)
+class Feed:
+    token: str
+    schedule_text: str
+    only_enrolled: bool
+    # seconds since the epoch
+    created: float
+    updated: float
+
+
+def new_token():
+    """
+    e.g. "Jq3v0h6T_d1xYw2k" (96 random bits, URL-safe)
+    """
+    return secrets.token_urlsafe(12)
+
+
+class MemoryFeedStore:
+    def __init__(self):
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def get(self, token):
+        with self._lock:
+            return self._feeds.get(token)
+
+    def put(self, feed):
+        with self._lock:
+            self._feeds[feed.token] = feed
+
+
+class SqliteFeedStore:
+    """
+    One row per feed; safe to share between uvicorn workers (WAL).
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS feeds ("
+            " token TEXT PRIMARY KEY, schedule_text TEXT NOT NULL, only_enrolled INTEGER NOT NULL,"
+            " created REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def get(self, token):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT token, schedule_text, only_enrolled, created, updated FROM feeds WHERE token = ?",
+                (token,),
+            ).fetchone()
+        if row is None:
+            return None
+        return Feed(row[0], row[1], bool(row[2]), row[3], row[4])
+
+    def put(self, feed):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds (token, schedule_text, only_enrolled, created, updated)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (feed.token, feed.schedule_text, int(feed.only_enrolled), feed.created, feed.updated),
+            )
+
+
+def store_from_url(url):
+    if url == "memory":
+        return MemoryFeedStore()
+    if url.startswith("sqlite:///"):
+        return SqliteFeedStore(url[len("sqlite:///"):])
+    raise ValueError(f"unknown FEED_STORE {url!r}")
+
+def get_store():
+    """
+    The configured store, opened on first use.
+    """
+    global _store
+    if _store is None:
+        _store = store_from_url(FEED_STORE)
+    return _store
+
+def set_store(store):
+    global _store
+    _store = store
+
+def save_feed(schedule_text, only_enrolled, token=None):
+    """
+    Store a paste under an existing feed's `token` (replacing its contents, so
+    subscriptions pick up the new schedule) or else under a new token => Feed.
+    Blocking: call it from a thread.
+    """
+    store = get_store()
+    now = time.time()
+    existing = store.get(token) if token else None
+    if existing is not None and existing.schedule_text == schedule_text and existing.only_enrolled == only_enrolled:
+        return existing
+    feed = Feed(
+        # tokens are only ever generated here, never chosen by the client
+        token=existing.token if existing else new_token(),
+        schedule_text=schedule_text,
+        only_enrolled=only_enrolled,
+        created=existing.created if existing else now,
+        updated=now,
+    )
+    store.put(feed)
+    return feed
+
+def load_feed(token):
+    """
+    Blocking: call it from a thread.
+    """
+    return get_store().get(token)
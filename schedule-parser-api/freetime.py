@@ -0,0 +1,96 @@
+"""
+Common free time of a group of students (study groups, TA office hours).
+
+Each schedule becomes a weekly occupancy bitset: 7 days x 288 five-minute
+slots, packed 8 slots per byte (7 x 36 bytes). A group's bitsets stack
+into an (n, 7, 36) uint8 array and combine with one bitwise reduction:
+
+    mode "all"   OR  of the busy bits => free when every student is free
+    mode "any"   AND of the busy bits => free when at least one student is
+
+so a group of hundreds costs a few array operations. Free runs inside the
+day window (default 08:00-22:00) of at least min_minutes come back as
+windows, e.g. {"day": "TU", "start": "15:05", "end": "17:20", "minutes": 135}.
+
+Class times come from conflicts.class_meetings (parse_days_times); the
+term dates are ignored, so paste one term per student.
+"""
+import re
+
+import numpy as np
+
+from calendarmaker import ICS_DAY_ORDER, PY_DAY_MAP
+from conflicts import class_meetings, hhmm
+
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+MODES = {"all": np.bitwise_or, "any": np.bitwise_and}
+# ASCII digits only: str.isdigit and int() also take e.g. "٠٨"
+HHMM_RE = re.compile(r'([0-9]{1,2}):([0-9]{2})')
+
+
+def occupancy(courses, only_enrolled=False):
+    """
+    Courses => packed (7, 36) uint8 busy bitset, Monday first; a slot is busy
+    when any class overlaps it (4:00PM - 5:05PM fills 16:00 up to 17:05).
+    """
+    busy = np.zeros((7, SLOTS_PER_DAY), dtype=bool)
+    for day, meetings in class_meetings(courses, only_enrolled).items():
+        row = busy[PY_DAY_MAP[day]]
+        for start, end, *_ in meetings:
+            row[start // SLOT_MINUTES:-(-end // SLOT_MINUTES)] = True
+    return np.packbits(busy, axis=1)
+
+def combine(grids, mode="all"):
+    """
+    (n, 7, 36) packed busy bitsets => (7, 288) bool free slots of the group.
+    """
+    busy = MODES[mode].reduce(np.asarray(grids, dtype=np.uint8), axis=0)
+    return ~np.unpackbits(busy, axis=1, count=SLOTS_PER_DAY).astype(bool)
+
+def parse_hhmm(value):
+    """
+    e.g. "08:00" => 480, "24:00" => 1440; ValueError for anything else ("8:75", "25:00")
+    """
+    m = HHMM_RE.fullmatch(value)
+    if m is None:
+        raise ValueError(f"not a time of day (HH:MM): {value!r}")
+    hours, mins = int(m.group(1)), int(m.group(2))
+    if not (0 <= hours <= 24 and 0 <= mins < 60) or hours * 60 + mins > 24 * 60:
+        raise ValueError(f"not a time of day (HH:MM): {value!r}")
+    return hours * 60 + mins
+
+def free_windows(free, day_start=8 * 60, day_end=22 * 60, min_minutes=30):
+    """
+    (7, 288) bool free slots => [{"day", "start", "end", "minutes"}, ...]
+    by day and time, clipped to day_start..day_end (minutes after midnight).
+    """
+    first = -(-day_start // SLOT_MINUTES)
+    last = day_end // SLOT_MINUTES
+    window = np.zeros_like(free)
+    window[:, first:last] = True
+    # run edges: +1 where a free run starts, -1 just past where it ends
+    edges = np.diff(np.pad(free & window, ((0, 0), (1, 1))).astype(np.int8), axis=1)
+    starts = np.argwhere(edges == 1)
+    ends = np.argwhere(edges == -1)
+
+    windows = []
+    for (day, start), (_, end) in zip(starts.tolist(), ends.tolist()):
+        minutes = (end - start) * SLOT_MINUTES
+        if minutes >= min_minutes:
+            windows.append({
+                "day": ICS_DAY_ORDER[day],
+                "start": hhmm(start * SLOT_MINUTES),
+                "end": hhmm(end * SLOT_MINUTES),
+                "minutes": minutes,
+            })
+    return windows
+
+def common_free_time(schedules, only_enrolled=False, mode="all", day_start=8 * 60, day_end=22 * 60, min_minutes=30):
+    """
+    [courses of each student, ...] => free windows of the group (see free_windows).
+    """
+    grids = [occupancy(courses, only_enrolled) for courses in schedules]
+    if not grids:
+        return []
+    return free_windows(combine(grids, mode), day_start, day_end, min_minutes)
@@ -0,0 +1,289 @@
+"""
+Push a parsed schedule straight into Google Calendar.
+
+Events are the same ones the ICS carries (calendarmaker.iter_class_events),
+sent through the Calendar API's batch endpoint (multipart/mixed, up to
+GCAL_BATCH_SIZE requests per HTTP call) over one pooled httpx client.
+
+Upserts are idempotent: every event id is icswriter.event_id (sha1 hex,
+valid Google event id), so each class is first PUT (events.update) and only
+the ones Google answers 404 for are then POSTed (events.insert) with that id.
+Exporting the same schedule twice updates the events in place.
+
+GCAL_API_BASE points the client elsewhere, e.g. at fake_gcal.py:
+    uvicorn fake_gcal:app --port 8081 & GCAL_API_BASE=http://localhost:8081 uvicorn main:app
+"""
+import asyncio
+import json
+import os
+import uuid
+from urllib.parse import quote
+
+import httpx
+
+from calendarmaker import iter_class_events
+from icswriter import TZID, event_id
+from occurrences import with_exdates
+
+GCAL_API_BASE = os.environ.get("GCAL_API_BASE", "https://www.googleapis.com").rstrip("/")
+# Google accepts up to 1000 calls per batch but recommends staying small
+GCAL_BATCH_SIZE = int(os.environ.get("GCAL_BATCH_SIZE", "50"))
+GCAL_RETRIES = int(os.environ.get("GCAL_RETRIES", "3"))
+# batch HTTP calls in flight at once for one export
+GCAL_PARALLEL = int(os.environ.get("GCAL_PARALLEL", "4"))
+# per-part statuses worth retrying (transient backend errors); 403 only for rate limits
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+
+_client = None
+
+
+class GcalError(Exception):
+    """
+    The batch call itself failed (auth, network, malformed response).
+    """
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def get_client():
+    """
+    The shared AsyncClient (keep-alive pool), created on first use.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=GCAL_API_BASE,
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _client
+
+async def aclose():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def gcal_datetime(ics_local):
+    """
+    e.g. "20250106T160000" => "2025-01-06T16:00:00"
+    """
+    d, t = ics_local.split("T")
+    return f"{d[:4]}-{d[4:6]}-{d[6:]}T{t[:2]}:{t[2:4]}:{t[4:6]}"
+
+def event_resource(fields):
+    """
+    Event fields from iter_class_events => Calendar API event resource.
+    """
+    resource = {
+        "id": event_id(fields),
+        "status": "confirmed",
+        "summary": fields["summary"],
+        "description": fields["description"],
+        "start": {"dateTime": gcal_datetime(fields["dtstart"]), "timeZone": TZID},
+        "end": {"dateTime": gcal_datetime(fields["dtend"]), "timeZone": TZID},
+        "recurrence": ["RRULE:" + fields["rrule"]],
+    }
+    if fields.get("exdate"):
+        resource["recurrence"].append(f"EXDATE;TZID={TZID}:" + ",".join(fields["exdate"]))
+    if fields["location"]:
+        resource["location"] = fields["location"]
+    return resource
+
+def course_events(courses):
+    events = [fields for course in courses for fields in iter_class_events(course)]
+    return [event_resource(fields) for fields in with_exdates(events)]
+
+# ---- multipart/mixed batch encoding ----
+
+def encode_batch(calls, boundary):
+    """
+    [(method, path, json body or None), ...] => multipart/mixed body;
+    part i gets Content-ID <item-i>.
+    """
+    parts = []
+    for i, (method, path, body) in enumerate(calls):
+        lines = [
+            f"--{boundary}",
+            "Content-Type: application/http",
+            f"Content-ID: <item-{i}>",
+            "",
+            f"{method} {path} HTTP/1.1",
+        ]
+        if body is None:
+            lines.append("")
+        else:
+            payload = json.dumps(body, separators=(",", ":"))
+            lines += ["Content-Type: application/json", f"Content-Length: {len(payload.encode())}", "", payload]
+        parts.append("\r\n".join(lines))
+    return "\r\n".join(parts) + f"\r\n--{boundary}--\r\n"
+
+def _split_head(text):
+    """
+    "headers\\r\\n\\r\\nbody" => ({lowercased name: value}, body); accepts bare \\n too.
+    """
+    for sep in ("\r\n\r\n", "\n\n"):
+        if sep in text:
+            head, body = text.split(sep, 1)
+            break
+    else:
+        head, body = text, ""
+    headers = {}
+    for line in head.splitlines():
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers, body
+
+def decode_batch(content_type, text):
+    """
+    multipart/mixed batch response => {item index: (status, parsed JSON body or None)}.
+    """
+    boundary = None
+    for param in content_type.split(";")[1:]:
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "boundary":
+            boundary = value.strip('"')
+    if not boundary:
+        raise GcalError(502, "batch response without a multipart boundary")
+
+    results = {}
+    for part in text.split(f"--{boundary}")[1:]:
+        if part.startswith("--"):
+            break
+        outer, inner = _split_head(part.strip("\r\n"))
+        # "<response-item-3>" => 3
+        content_id = outer.get("content-id", "").strip("<>")
+        index = int(content_id.rsplit("-", 1)[-1])
+        status_line, _, rest = inner.partition("\n")
+        _, body = _split_head(rest)
+        body = body.strip()
+        try:
+            parsed = json.loads(body) if body else None
+        except ValueError:
+            parsed = None
+        results[index] = (int(status_line.split()[1]), parsed)
+    return results
+
+# ---- export ----
+
+async def send_batch(calls, access_token):
+    """
+    One batch HTTP call => [(status, body)] in the order of `calls`.
+    """
+    boundary = "batch_" + uuid.uuid4().hex
+    try:
+        r = await get_client().post(
+            "/batch/calendar/v3",
+            content=encode_batch(calls, boundary),
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Content-Type": f"multipart/mixed; boundary={boundary}",
+            },
+        )
+    except httpx.HTTPError as e:
+        raise GcalError(502, f"unreachable: {e}")
+    if r.status_code != 200:
+        raise GcalError(r.status_code, r.text[:500])
+    results = decode_batch(r.headers.get("content-type", ""), r.text)
+    return [results.get(i, (502, None)) for i in range(len(calls))]
+
+def retryable(status, body):
+    if status in RETRY_STATUSES:
+        return True
+    if status == 403 and isinstance(body, dict):
+        errors = (body.get("error") or {}).get("errors") or []
+        return any(e.get("reason") in RATE_LIMIT_REASONS for e in errors)
+    return False
+
+async def run_calls(calls, access_token):
+    """
+    Send calls in batches of GCAL_BATCH_SIZE (GCAL_PARALLEL batches at a
+    time over the pooled client), retrying rate-limited or failed parts
+    with backoff => [(status, body)] in order.
+    """
+    results = [None] * len(calls)
+    pending = list(range(len(calls)))
+    sem = asyncio.Semaphore(GCAL_PARALLEL)
+
+    async def run_chunk(chunk):
+        async with sem:
+            for i, result in zip(chunk, await send_batch([calls[i] for i in chunk], access_token)):
+                results[i] = result
+
+    for attempt in range(GCAL_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+        await asyncio.gather(*(
+            run_chunk(pending[start:start + GCAL_BATCH_SIZE])
+            for start in range(0, len(pending), GCAL_BATCH_SIZE)
+        ))
+        pending = [i for i in pending if retryable(*results[i])]
+        if not pending:
+            break
+    return results
+
+async def export_events(events, access_token, calendar_id="primary"):
+    """
+    Upsert event resources into a calendar => {"created", "updated", "failed"}.
+    """
+    base = f"/calendar/v3/calendars/{quote(calendar_id, safe='@.')}/events"
+    updates = [("PUT", f"{base}/{e['id']}", e) for e in events]
+    results = await run_calls(updates, access_token)
+
+    summary = {"created": 0, "updated": 0, "failed": []}
+    missing = []
+    for event, (status, body) in zip(events, results):
+        if status == 200:
+            summary["updated"] += 1
+        elif status in (404, 410):
+            missing.append(event)
+        else:
+            summary["failed"].append(failure(event, status, body))
+
+    if missing:
+        inserts = [("POST", base, e) for e in missing]
+        for event, (status, body) in zip(missing, await run_calls(inserts, access_token)):
+            if status == 200:
+                summary["created"] += 1
+            else:
+                summary["failed"].append(failure(event, status, body))
+    return summary
+
+async def delete_events(event_ids, access_token, calendar_id="primary"):
+    """
+    Delete events by id => {"deleted": n, "failed": [...]}; already gone counts as deleted.
+    """
+    base = f"/calendar/v3/calendars/{quote(calendar_id, safe='@.')}/events"
+    results = await run_calls([("DELETE", f"{base}/{i}", None) for i in event_ids], access_token)
+    summary = {"deleted": 0, "failed": []}
+    for i, (status, body) in zip(event_ids, results):
+        if status in (200, 204, 404, 410):
+            summary["deleted"] += 1
+        else:
+            summary["failed"].append(failure({"id": i, "summary": ""}, status, body))
+    return summary
+
+def failure(event, status, body):
+    message = ((body or {}).get("error") or {}).get("message", "") if isinstance(body, dict) else ""
+    return {"id": event["id"], "summary": event["summary"], "status": status, "message": message}
+
+async def export_courses(courses, access_token, calendar_id="primary"):
+    return await export_events(course_events(courses), access_token, calendar_id)
+
+async def sync_delta(delta, access_token, calendar_id="primary"):
+    """
+    Apply a schedulediff delta: upsert added/changed events, delete removed ones.
+    => {"created", "updated", "deleted", "failed"}
+    """
+    upserts = [event_resource(f) for f in with_exdates(delta["added"] + delta["changed"])]
+    summary = await export_events(upserts, access_token, calendar_id) if upserts else \
+        {"created": 0, "updated": 0, "failed": []}
+    summary["deleted"] = 0
+    if delta["removed"]:
+        deleted = await delete_events([event_id(f) for f in delta["removed"]], access_token, calendar_id)
+        summary["deleted"] = deleted["deleted"]
+        summary["failed"] += deleted["failed"]
+    return summary
@@ -0,0 +1,181 @@
+"""
+Small RFC 5545 writer for the calendars we generate.
+
+Replaces the ics.py Calendar/Event objects on the request path: the event
+fields from calendarmaker.iter_class_events are written straight out as
+VCALENDAR text, so there is no TZID casing to fix afterwards and the same
+input always gives the same bytes.
+"""
+import hashlib
+import itertools
+
+from calendarmaker import VTIMEZONE_LINES, iter_class_events
+from occurrences import expand_events, with_exdates
+
+CRLF = "\r\n"
+PRODID = "-//UCSCtoGCal//Schedule Parser//EN"
+TZID = "America/Los_Angeles"
+UID_DOMAIN = "ucsctogcal"
+# Bump whenever the rendered bytes change for the same input;
+# it is part of the ETag and cache keys.
+RENDER_VERSION = 3
+# events handed to occurrences (holidays / expansion) at a time
+EVENT_BLOCK = 512
+
+# RFC 5545 3.3.11: backslash first, then the other specials.
+_TEXT_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    ";": "\\;",
+    ",": "\\,",
+    "\n": "\\n",
+    "\r": "",
+})
+
+def escape_text(value):
+    """
+    e.g. "Lab, Sec 2; TBA" => "Lab\\, Sec 2\\; TBA"
+    """
+    return value.translate(_TEXT_ESCAPES)
+
+def fold_line(line):
+    """
+    Fold a content line to at most 75 octets per physical line
+    (RFC 5545 3.1), never splitting a UTF-8 character.
+    """
+    if len(line) <= 75 and line.isascii():
+        return line
+
+    data = line.encode("utf-8")
+    if len(data) <= 75:
+        return line
+
+    parts = []
+    start = 0
+    limit = 75  # continuation lines lose one octet to the leading space
+    while len(data) - start > limit:
+        end = start + limit
+        # back off continuation bytes (0b10xxxxxx) so we cut on a char boundary
+        while data[end] & 0xC0 == 0x80:
+            end -= 1
+        parts.append(data[start:end].decode("utf-8"))
+        start = end
+        limit = 74
+    parts.append(data[start:].decode("utf-8"))
+    return (CRLF + " ").join(parts)
+
+def event_id(fields):
+    """
+    Stable id of a class meeting: class number, section, term dates and days.
+    Re-rendering (or re-importing) the same class gives the same id, while
+    a time or room change keeps it so calendars update the event in place.
+    Lowercase hex, so it is also a valid Google Calendar event id.
+    """
+    key = "|".join((
+        fields["class_nbr"], fields["section"],
+        fields["term_start"], fields["term_end"], fields["byday"],
+    ))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+def event_uid(fields):
+    """
+    e.g. "5f0c...e1@ucsctogcal", or "5f0c...e1-20250106@ucsctogcal" for
+    one meeting of an expanded event
+    """
+    if fields.get("occurrence"):
+        return f"{event_id(fields)}-{fields['occurrence']}@{UID_DOMAIN}"
+    return f"{event_id(fields)}@{UID_DOMAIN}"
+
+def vevent_lines(fields):
+    """
+    Content lines (unfolded) for one event from iter_class_events.
+    """
+    lines = [
+        "BEGIN:VEVENT",
+        "UID:" + event_uid(fields),
+        # required by RFC 5545; derived from the term so the bytes stay stable
+        f"DTSTAMP:{fields['term_start']}T000000Z",
+        f"DTSTART;TZID={TZID}:{fields['dtstart']}",
+        f"DTEND;TZID={TZID}:{fields['dtend']}",
+    ]
+    # expanded meetings (occurrences.expand_events) have no RRULE
+    if fields["rrule"]:
+        lines.append("RRULE:" + fields["rrule"])
+    # holiday meetings, from occurrences.with_exdates
+    if fields.get("exdate"):
+        lines.append(f"EXDATE;TZID={TZID}:" + ",".join(fields["exdate"]))
+    lines += [
+        "SUMMARY:" + escape_text(fields["summary"]),
+        "DESCRIPTION:" + escape_text(fields["description"]),
+    ]
+    if fields["location"]:
+        lines.append("LOCATION:" + escape_text(fields["location"]))
+    # only set on schedulediff updates/cancellations
+    if "sequence" in fields:
+        lines.append(f"SEQUENCE:{fields['sequence']}")
+    if "status" in fields:
+        lines.append("STATUS:" + fields["status"])
+    lines.append("END:VEVENT")
+    return lines
+
+def iter_calendar(courses, expanded=False):
+    """
+    Yields the calendar as CRLF-terminated, folded lines:
+    VCALENDAR header, the LA VTIMEZONE, then one VEVENT per class
+    (with EXDATEs for holidays), or with expanded=True one per meeting.
+    """
+    return iter_calendar_events(
+        (fields for course in courses for fields in iter_class_events(course)), expanded
+    )
+
+def iter_calendar_events(events, expanded=False):
+    """
+    Same as iter_calendar, from event fields already made by iter_class_events.
+    """
+    apply = expand_events if expanded else with_exdates
+
+    yield "BEGIN:VCALENDAR" + CRLF
+    yield "VERSION:2.0" + CRLF
+    yield "PRODID:" + PRODID + CRLF
+    for line in VTIMEZONE_LINES:
+        yield line + CRLF
+
+    events = iter(events)
+    while block := list(itertools.islice(events, EVENT_BLOCK)):
+        for fields in apply(block):
+            for line in vevent_lines(fields):
+                yield fold_line(line) + CRLF
+
+    yield "END:VCALENDAR" + CRLF
+
+def iter_calendar_chunks(courses, chunk_size=16384, expanded=False):
+    """
+    Same text as iter_calendar, grouped for a streaming response: the header
+    and VTIMEZONE go out as the first chunk before any course is read,
+    then the VEVENTs in chunks of about chunk_size characters.
+    """
+    lines = iter_calendar(courses, expanded)
+    yield "".join(itertools.islice(lines, 3 + len(VTIMEZONE_LINES)))
+
+    buf = []
+    size = 0
+    for line in lines:
+        buf.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(buf)
+            buf = []
+            size = 0
+    if buf:
+        yield "".join(buf)
+
+def render_calendar(courses, expanded=False):
+    """
+    Whole calendar as a single ICS string.
+    """
+    return "".join(iter_calendar(courses, expanded))
+
+def render_events(events, expanded=False):
+    """
+    Whole calendar as a single ICS string, from event fields.
+    """
+    return "".join(iter_calendar_events(events, expanded))
@@ -1,19 +1,60 @@
-from fastapi import FastAPI, HTTPException, Depends
-from typing import Annotated, List, Optional
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Header, Query, Request
+from typing import List, Literal, Optional
+from pydantic import BaseModel, TypeAdapter
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
+import anyio.to_thread
+import asyncio
+import email.utils
+import io
+import json
 import os
-from textparser import parse_schedule_text
-from localeventmaker import create_events_for_course
-from calendarmaker import build_calendar
-from datetime import date, timedelta
-from ics import Calendar, Event
-from pprint import pprint
-import fileinput
+import re
+import sys
+import time
+import zipfile
+from contextlib import asynccontextmanager
+import feedstore
+import profiling
+import schedulediff
+from cache import schedule_key
+from catalog import get_catalog
+from metrics import MetricsMiddleware, render_prometheus
+from pipeline import (
+    STREAM_THRESHOLD, Overloaded, cache_stats, conflicts_batch, courses_etag, get_pool, ics_etag,
+    metrics_lines, occupancy_batch, parse_and_render, parse_courses_async, pool_broken, render_schedule_async,
+    render_schedules, reset_pool, shutdown_pool, stream_courses, stream_schedule, warm_up
+)
+from conflicts import find_conflicts
+from records import Course
+from textparser import is_class_number_list
+
+# Most schedules accepted by one /parseSchedules call
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "1000"))
+
+
+# AnyIO threadpool size for sync endpoints and to_thread work (default 40)
+THREADPOOL_SIZE = int(os.environ.get("THREADPOOL_SIZE", "0"))
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if THREADPOOL_SIZE:
+        anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # uvicorn only starts accepting once this returns, so no request
+    # pays for imports, regex compiles or spawning pool workers
+    app.state.ready = False
+    await asyncio.to_thread(warm_up)
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    shutdown_pool()
+    # gcal (and httpx) are imported on the first export only
+    if "gcal" in sys.modules:
+        await sys.modules["gcal"].aclose()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 origins = [
     "https://ucscstc.vercel.app"
@@ -26,86 +67,452 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"]
 )
+app.add_middleware(MetricsMiddleware)
 
 # Define your request payload structure
 class ScheduleRequest(BaseModel):
     scheduleText: str
     onlyEnrolledCourses: bool
+    # Only used by /parseSchedules to name each student's calendar
+    studentId: Optional[str] = None
+    # With /parseSchedule?subscribe=true: the feed to update instead of creating a new one
+    feedToken: Optional[str] = None
 
-# Define what the parsed result might look like
-# For example, a list of Course objects...
-class ClassInfo(BaseModel):
-    class_nbr: str
-    section: str
-    component: str
-    days_times: str
-    room: str
-    instructor: str
-    start_end: str
-
-class Course(BaseModel):
-    course_title: str
-    status: Optional[str] = None
-    units: Optional[str] = None
-    grading: Optional[str] = None
-    general_education: Optional[str] = None
-    classes: List[ClassInfo] = []
-
+# The parsed result: Course / ClassInfo records (see records.py) are the
+# parser's output, the calendar builder's input and the JSON schema.
+# pydantic-core serializes them straight to JSON bytes for format=json/ndjson.
+COURSES_ADAPTER = TypeAdapter(List[Course])
+COURSE_ADAPTER = TypeAdapter(Course)
 
 
 @app.get('/')
 async def check():
     return 'hello'
 
+@app.get('/ready')
+async def ready():
+    """
+    Readiness probe: 200 once warm-up has finished, 503 before and while shutting
+    down, and when a pool worker has died (the broken pool is replaced here, so
+    a later probe comes back 200).
+    """
+    if not getattr(app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Warming up")
+    if pool_broken():
+        reset_pool(get_pool())
+        raise HTTPException(status_code=503, detail="Worker pool broken, restarting it")
+    return {"ready": True}
+
 @app.get('/info')
 async def info():
     return """Hi! My name is Pranav, and I built this because I am tired of always trying to put my UCSC schedule into my Google Calendar Manually.
     It turns out I could make this 30 minute problem into a 2 day problem! This is also my first time deploying anything and have it run live, so contact me at ppurathe@ucsc.edu if there are any issues!"""
 
-# @app.post("/parseSchedule", response_model=List[Course])
+def check_class_number_list(schedule_text: str):
+    """
+    422 for a paste of bare class numbers when no term catalog is loaded.
+    """
+    if get_catalog() is None and is_class_number_list(schedule_text.strip()):
+        raise HTTPException(status_code=422, detail="Class number lists need a term catalog (CATALOG_PATH)")
+
+def ics_headers(etag: str):
+    return {
+        "Content-Disposition": 'attachment; filename="my_schedule.ics"',
+        "ETag": etag,
+        "Cache-Control": "no-cache",
+    }
+
+def busy_error():
+    return HTTPException(status_code=503, detail="Server busy, try again shortly", headers={"Retry-After": "1"})
+
+def etag_matches(if_none_match: Optional[str], etag: str):
+    """
+    If-None-Match check: "*", or any listed tag (weak W/ prefix ignored).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+@app.get('/cache/stats')
+async def get_cache_stats():
+    return cache_stats()
+
+@app.get('/metrics')
+async def get_metrics():
+    """
+    Prometheus text format: per-stage timings, courses/classes/events per
+    calendar, skipped class rows, request latency, cache and queue stats.
+    """
+    return Response(content=render_prometheus(metrics_lines()), media_type="text/plain; version=0.0.4")
+
 @app.post("/parseSchedule")
-def parse_schedule(payload: ScheduleRequest):
+async def parse_schedule(
+    payload: ScheduleRequest,
+    request: Request,
+    format: Literal["ics", "json", "ndjson"] = Query("ics"),
+    subscribe: bool = Query(False),
+    conflicts: bool = Query(False),
+    expand: bool = Query(False),
+    if_none_match: Optional[str] = Header(None),
+    x_profile: Optional[str] = Header(None),
+):
     """
     Endpoint to parse the UCSC schedule text.
     Expects JSON: { "scheduleText": "CSE 111 - Adv Programming\n..." }
-    Returns a list of Course objects in JSON.
+    (or, with a term catalog configured, just class numbers: "30481 33007 ...")
+    Returns the ICS calendar with an ETag; sending that back in
+    If-None-Match gets a 304 without re-rendering.
+    format=json returns the parsed courses (List[Course]) instead and
+    format=ndjson streams them one per line; neither builds a calendar.
+    subscribe=true also saves the schedule as a calendar feed (updating the
+    one named by feedToken, if any) and returns its token and webcal URL in
+    the X-Feed-Token / X-Feed-Url headers.
+    Meetings on academic holidays are left out with EXDATE; expand=true
+    instead writes one event per meeting, for calendars that ignore EXDATE.
+    conflicts=true adds X-Schedule-Conflicts: a JSON list of overlapping
+    classes (see conflicts.py; not computed for streamed pastes).
+    With profiling enabled (see profiling.py), an X-Profile admin header
+    profiles this request and returns X-Profile-Id for GET /profiles/{id}.
     """
     # 1. Extract the schedule text from the request
     schedule_text = payload.scheduleText
     onlyenrolledcourses = payload.onlyEnrolledCourses
+    check_class_number_list(schedule_text)
 
-    # 2. Call your actual parser function
-    parsed_courses = parse_schedule_text(schedule_text, onlyenrolledcourses)
+    key = schedule_key(schedule_text)
+    if format != "ics":
+        return await parsed_courses_response(schedule_text, onlyenrolledcourses, key, format, if_none_match, conflicts)
 
-    # cal = Calendar()
+    etag = ics_etag(key, onlyenrolledcourses, expand)
+    headers = ics_headers(etag)
+    if subscribe:
+        feed = await asyncio.to_thread(feedstore.save_feed, schedule_text, onlyenrolledcourses, payload.feedToken)
+        headers["X-Feed-Token"] = feed.token
+        headers["X-Feed-Url"] = feed_url(request, feed.token)
 
-    # for course in parsed_courses:
-    #     events = create_events_for_course(course)
-    #     for e in events:
-    #         cal.events.add(e)
+    if x_profile is not None and profiling.enabled(x_profile):
+        # inline, uncached: the profile shows the real parse -> events -> serialize work
+        (_, ics_text, _), profile_id = await asyncio.to_thread(
+            profiling.profile_call, parse_and_render, schedule_text, onlyenrolledcourses, expand
+        )
+        headers["X-Profile-Id"] = profile_id
+        return Response(content=ics_text, media_type="text/calendar", headers=headers)
 
-    cal = build_calendar(parsed_courses)
-    
-    filename = "my.ics"
-    with open(filename, 'w') as my_file:
-        my_file.writelines(cal.serialize_iter())
-        # my_file.replace("DTSTART;TZID=AMERICA/LOS_ANGELES", "DTSTART;TZID=America/Los_Angeles")
-        # my_file.replace("DTEND;TZID=AMERICA/LOS_ANGELES", "DTEND;TZID=America/Los_Angeles")
+    if etag_matches(if_none_match, etag):
+        headers.pop("Content-Disposition")
+        return Response(status_code=304, headers=headers)
 
-    with fileinput.FileInput(filename, inplace=True, backup='.bak') as file:
-        for line in file:
-            print(line.replace("DTSTART;TZID=AMERICA/LOS_ANGELES", "DTSTART;TZID=America/Los_Angeles"), end='')
-    with fileinput.FileInput(filename, inplace=True, backup='.bak') as file:
-        for line in file:
-            print(line.replace("DTEND;TZID=AMERICA/LOS_ANGELES", "DTEND;TZID=America/Los_Angeles"), end='')
+    # 2. Very large pastes (multi-term histories) stream: the VCALENDAR header
+    #    goes out first and each VEVENT follows as its course is parsed.
+    if len(schedule_text) >= STREAM_THRESHOLD:
+        try:
+            chunks = await stream_schedule(schedule_text, onlyenrolledcourses, expand)
+        except Overloaded:
+            raise busy_error()
+        return StreamingResponse(chunks, media_type="text/calendar", headers=headers)
 
-    
+    # 3. Everything else is rendered straight to RFC 5545 text (TZID already in
+    #    the right case, all in memory). Repeat submissions of the same paste come
+    #    from the cache; misses run in the worker pool; past the queue limit we answer 503.
+    try:
+        ics_text = await render_schedule_async(schedule_text, onlyenrolledcourses, key, expand)
+        if conflicts:
+            # the render just cached the parse, so this is a lookup plus the sweep
+            courses = await parse_courses_async(schedule_text, onlyenrolledcourses, key)
+            headers.update(conflict_headers(courses, onlyenrolledcourses))
+    except Overloaded:
+        raise busy_error()
 
-    # 3. Return the file as an attachment
+    # 4. Return the calendar as an attachment
     # "media_type" tells the browser it's a text/calendar (ICS) file
-    return FileResponse(
-        path=filename,
+    return Response(content=ics_text, media_type="text/calendar", headers=headers)
+
+def feed_url(request: Request, token: str):
+    """
+    e.g. "webcal://api.example.com/calendar/Jq3v0h6T_d1xYw2k.ics"
+    """
+    url = str(request.url_for("calendar_feed", token=token))
+    return "webcal://" + url.split("://", 1)[1]
+
+@app.get("/calendar/{token}.ics")
+async def calendar_feed(
+    token: str,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+):
+    """
+    Subscribable feed of a schedule saved with /parseSchedule?subscribe=true.
+    Polls with If-None-Match / If-Modified-Since get a 304 without rendering;
+    otherwise the calendar comes from the render cache like /parseSchedule.
+    """
+    feed = await asyncio.to_thread(feedstore.load_feed, token)
+    if feed is None:
+        raise HTTPException(status_code=404, detail="Feed not found")
+
+    key = schedule_key(feed.schedule_text)
+    etag = ics_etag(key, feed.only_enrolled)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": email.utils.formatdate(feed.updated, usegmt=True),
+        "Cache-Control": "private, max-age=300",
+    }
+    if etag_matches(if_none_match, etag) or (if_none_match is None and not_modified_since(if_modified_since, feed.updated)):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        ics_text = await render_schedule_async(feed.schedule_text, feed.only_enrolled, key)
+    except Overloaded:
+        raise busy_error()
+    return Response(content=ics_text, media_type="text/calendar", headers=headers)
+
+def not_modified_since(if_modified_since: Optional[str], updated: float):
+    """
+    If-Modified-Since check (HTTP dates have whole-second precision).
+    """
+    if not if_modified_since:
+        return False
+    try:
+        since = email.utils.parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    return int(updated) <= since.timestamp()
+
+def conflict_headers(courses, only_enrolled):
+    found = find_conflicts(courses, only_enrolled)
+    return {"X-Schedule-Conflicts": json.dumps(found, separators=(",", ":"))}
+
+async def parsed_courses_response(schedule_text, onlyenrolledcourses, key, format, if_none_match, conflicts=False):
+    """
+    /parseSchedule with format=json or ndjson: parse only, no ICS.
+    """
+    etag = courses_etag(key, onlyenrolledcourses)
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    try:
+        if format == "ndjson":
+            if conflicts and len(schedule_text) < STREAM_THRESHOLD:
+                # headers go out before the first line: parse (and cache) up front
+                all_courses = await parse_courses_async(schedule_text, onlyenrolledcourses, key)
+                headers.update(conflict_headers(all_courses, onlyenrolledcourses))
+            courses = await stream_courses(schedule_text, onlyenrolledcourses, key)
+
+            async def lines():
+                async for course in courses:
+                    yield COURSE_ADAPTER.dump_json(course) + b"\n"
+            return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
+
+        courses = await parse_courses_async(schedule_text, onlyenrolledcourses, key)
+    except Overloaded:
+        raise busy_error()
+    if conflicts:
+        headers.update(conflict_headers(courses, onlyenrolledcourses))
+    return Response(content=COURSES_ADAPTER.dump_json(courses), media_type="application/json", headers=headers)
+
+class GcalExportRequest(ScheduleRequest):
+    # "primary", or the id of a calendar the token can write to
+    calendarId: str = "primary"
+
+@app.post("/exportGoogleCalendar")
+async def export_google_calendar(payload: GcalExportRequest, authorization: Optional[str] = Header(None)):
+    """
+    Push the schedule's events into the user's Google Calendar instead of
+    returning an ICS file. Expects an OAuth access token with calendar scope
+    as "Authorization: Bearer <token>". Safe to repeat: events are upserted
+    by stable ids, so re-exporting updates them rather than duplicating.
+    Returns {"created": n, "updated": n, "failed": [...]}.
+    """
+    import gcal
+
+    check_class_number_list(payload.scheduleText)
+    token = bearer_token(authorization)
+    try:
+        courses = await parse_courses_async(payload.scheduleText, payload.onlyEnrolledCourses)
+    except Overloaded:
+        raise busy_error()
+    try:
+        return await gcal.export_courses(courses, token, payload.calendarId)
+    except gcal.GcalError as e:
+        raise gcal_error(e)
+
+def bearer_token(authorization: Optional[str]):
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise HTTPException(status_code=401, detail="Missing Google access token",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return token
+
+def gcal_error(e):
+    # pass auth problems through so the client can refresh its token
+    status = e.status if e.status in (401, 403) else 502
+    return HTTPException(status_code=status, detail=f"Google Calendar: {e.message}")
+
+class SyncRequest(GcalExportRequest):
+    # the paste the student's current calendar was generated from
+    previousScheduleText: str
+    # SEQUENCE for updated/cancelled events; must grow with every sync (defaults to the Unix time)
+    sequence: Optional[int] = None
+
+@app.post("/syncSchedule")
+async def sync_schedule(
+    payload: SyncRequest,
+    format: Literal["ics", "json", "gcal"] = Query("ics"),
+    authorization: Optional[str] = Header(None),
+):
+    """
+    Re-submission of a schedule: compares it with previousScheduleText
+    (by class number and section) and returns only what changed:
+      ics  - new VEVENTs, updates with a higher SEQUENCE, STATUS:CANCELLED for
+             dropped/removed classes (an empty VCALENDAR when nothing changed)
+      json - {"added": [...], "changed": [...], "removed": [...]}
+      gcal - applies the delta to Google Calendar (Bearer token as in /exportGoogleCalendar)
+    """
+    only_enrolled = payload.onlyEnrolledCourses
+    check_class_number_list(payload.scheduleText)
+    check_class_number_list(payload.previousScheduleText)
+    try:
+        # both parses are cached, so a follow-up sync only parses the newest paste
+        old = await parse_courses_async(payload.previousScheduleText, False)
+        new = await parse_courses_async(payload.scheduleText, False)
+    except Overloaded:
+        raise busy_error()
+    delta = schedulediff.diff_schedules(old, new, only_enrolled)
+
+    if format == "json":
+        return schedulediff.delta_summary(delta)
+
+    if format == "gcal":
+        import gcal
+
+        token = bearer_token(authorization)
+        try:
+            return await gcal.sync_delta(delta, token, payload.calendarId)
+        except gcal.GcalError as e:
+            raise gcal_error(e)
+
+    sequence = payload.sequence if payload.sequence is not None else int(time.time())
+    return Response(
+        content=schedulediff.render_delta(delta, sequence),
         media_type="text/calendar",
-        filename="my_schedule.ics"
+        headers={"Content-Disposition": 'attachment; filename="schedule_changes.ics"'},
     )
 
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, x_profile: Optional[str] = Header(None)):
+    """
+    Download a profile captured by /parseSchedule (same X-Profile token).
+    """
+    found = profiling.enabled(x_profile) and profiling.profile_file(profile_id)
+    if not found:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    path, media_type = found
+    return FileResponse(path, media_type=media_type, filename=os.path.basename(path))
+
+def batch_names(payloads: List[ScheduleRequest]):
+    """
+    One unique, filename-safe name per payload: the studentId if given, else "schedule_<n>".
+    """
+    names = []
+    seen = set()
+    for i, p in enumerate(payloads, start=1):
+        base = re.sub(r'[^A-Za-z0-9_.-]', '_', p.studentId or "") or f"schedule_{i}"
+        name, n = base, i
+        # a suffixed name may itself be taken, e.g. ["x", "x_3", "x"]
+        while name in seen:
+            name = f"{base}_{n}"
+            n += 1
+        seen.add(name)
+        names.append(name)
+    return names
+
+@app.post("/conflicts")
+async def schedule_conflicts(payloads: List[ScheduleRequest]):
+    """
+    Batch conflict check, e.g. for advisors at the start of term.
+    Expects a JSON list of ScheduleRequest objects; returns a JSON object
+    mapping each name (as in /parseSchedules) to its list of conflicts.
+    """
+    if len(payloads) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} schedules per batch")
+
+    jobs = [(p.scheduleText, p.onlyEnrolledCourses) for p in payloads]
+    try:
+        results = await conflicts_batch(jobs)
+    except Overloaded:
+        raise busy_error()
+    return dict(zip(batch_names(payloads), results))
+
+class FreeTimeRequest(BaseModel):
+    schedules: List[ScheduleRequest]
+    # "all": when every student is free, "any": when at least one is
+    mode: Literal["all", "any"] = "all"
+    # only report free time between these times of day
+    dayStart: str = "08:00"
+    dayEnd: str = "22:00"
+    minMinutes: int = 30
+
+@app.post("/freeTime")
+async def free_time(payload: FreeTimeRequest):
+    """
+    Common free time of a group, e.g. for a study group or TA office hours.
+    Returns {"students": n, "mode": ..., "windows": [{"day": "TU", "start": "15:05",
+    "end": "17:20", "minutes": 135}, ...]} (see freetime.py).
+    """
+    import freetime
+
+    if not payload.schedules:
+        raise HTTPException(status_code=422, detail="No schedules given")
+    if len(payload.schedules) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} schedules per group")
+    try:
+        day_start = freetime.parse_hhmm(payload.dayStart)
+        day_end = freetime.parse_hhmm(payload.dayEnd)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    jobs = [(p.scheduleText, p.onlyEnrolledCourses) for p in payload.schedules]
+    try:
+        grids = await occupancy_batch(jobs)
+    except Overloaded:
+        raise busy_error()
+    free = freetime.combine(grids, payload.mode)
+    return {
+        "students": len(grids),
+        "mode": payload.mode,
+        "windows": freetime.free_windows(free, day_start, day_end, payload.minMinutes),
+    }
+
+@app.post("/parseSchedules")
+async def parse_schedules(payloads: List[ScheduleRequest], format: Literal["zip", "json"] = Query("zip")):
+    """
+    Batch version of /parseSchedule, e.g. for the advising office.
+    Expects a JSON list of ScheduleRequest objects.
+    Returns a zip with one <studentId>.ics per schedule, or with format=json
+    a JSON object mapping each name to its ICS text.
+    """
+    if len(payloads) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BATCH_SIZE} schedules per batch")
+
+    jobs = [(p.scheduleText, p.onlyEnrolledCourses) for p in payloads]
+    try:
+        # fans out across the pool, holding at most BATCH_INFLIGHT admission slots
+        calendars = await render_schedules(jobs)
+    except Overloaded:
+        raise busy_error()
+    names = batch_names(payloads)
+
+    if format == "json":
+        return dict(zip(names, calendars))
+
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, ics_text in zip(names, calendars):
+            zf.writestr(f"{name}.ics", ics_text)
+    return Response(
+        content=buf.getvalue(),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="schedules.zip"'}
+    )
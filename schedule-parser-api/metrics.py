@@ -0,0 +1,170 @@
+"""
+In-process metrics with a Prometheus text exporter.
+
+Recording is a bisect and a few integer adds under a lock, so it stays on
+the hot path; the text format is only built when /metrics is scraped.
+With several uvicorn workers each worker keeps (and serves) its own numbers.
+"""
+import bisect
+import threading
+import time
+
+# seconds, for the per-stage timings
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# items per request (courses, classes, events)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+_lock = threading.Lock()
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, one series per label value.
+    """
+    def __init__(self, name, help, label, buckets):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        self.series = {}  # label value -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, label_value, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with _lock:
+            s = self.series.get(label_value)
+            if s is None:
+                s = self.series[label_value] = [0] * (len(self.buckets) + 2)
+            s[i] += 1
+            s[-1] += value
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        with _lock:
+            series = {k: list(v) for k, v in self.series.items()}
+        for label_value, s in sorted(series.items()):
+            lbl = f'{self.label}="{label_value}"'
+            running = 0
+            for bound, n in zip(self.buckets, s):
+                running += n
+                yield f'{self.name}_bucket{{{lbl},le="{bound}"}} {running}'
+            running += s[len(self.buckets)]
+            yield f'{self.name}_bucket{{{lbl},le="+Inf"}} {running}'
+            yield f"{self.name}_sum{{{lbl}}} {s[-1]}"
+            yield f"{self.name}_count{{{lbl}}} {running}"
+
+
+class Counter:
+    """
+    Monotonic counter, one series per tuple of label values.
+    """
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.series = {}
+
+    def inc(self, *label_values, amount=1):
+        with _lock:
+            self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        with _lock:
+            series = dict(self.series)
+        for label_values, value in sorted(series.items()):
+            yield f"{self.name}{format_labels(self.labels, label_values)} {value}"
+
+
+def format_labels(names, values):
+    """
+    e.g. ("cache",), ("ics",) => '{cache="ics"}'
+    """
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, values)) + "}"
+
+
+STAGE_SECONDS = Histogram(
+    "schedule_stage_seconds", "Time spent per pipeline stage (parse, events, serialize, stream).",
+    "stage", LATENCY_BUCKETS)
+REQUEST_SECONDS = Histogram(
+    "http_request_seconds", "Request latency until the last response byte is written.",
+    "path", LATENCY_BUCKETS)
+ITEMS_PER_RENDER = Histogram(
+    "schedule_items_per_render", "Courses, classes and events per rendered calendar.",
+    "kind", COUNT_BUCKETS)
+SKIPPED_CLASSES = Counter(
+    "schedule_skipped_classes_total", "Class rows left out of the calendar (TBA or unparseable days/times/dates).")
+REQUESTS = Counter("http_requests_total", "Requests by route and status code.", ("path", "status"))
+
+REGISTRY = [STAGE_SECONDS, REQUEST_SECONDS, ITEMS_PER_RENDER, SKIPPED_CLASSES, REQUESTS]
+
+
+def record_render(stats):
+    """
+    Record the stats dict returned by pipeline's render functions
+    (None on a cache hit, where nothing was parsed or rendered).
+    """
+    if not stats:
+        return
+    for stage in ("parse", "events", "serialize"):
+        if stage in stats:
+            STAGE_SECONDS.observe(stage, stats[stage])
+    for kind in ("courses", "classes", "events"):
+        if f"n_{kind}" in stats:
+            ITEMS_PER_RENDER.observe(kind, stats[f"n_{kind}"])
+    # parse-only stats (JSON output) have no events, hence no skips
+    if "n_events" in stats:
+        skipped = stats["n_classes"] - stats["n_events"]
+        if skipped:
+            SKIPPED_CLASSES.inc(amount=skipped)
+
+def render_prometheus(extra_lines=()):
+    """
+    Everything in REGISTRY plus extra_lines, in the Prometheus text format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.lines())
+    lines.extend(extra_lines)
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing each HTTP request until its final body message,
+    so streamed responses include the time spent writing them out.
+    Labelled by route path (e.g. "/parseSchedule"), not the raw URL.
+    """
+    def __init__(self, app):
+        self.app = app
+        self._paths = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                path = self.route_path(scope)
+                REQUEST_SECONDS.observe(path, time.perf_counter() - start)
+                REQUESTS.inc(path, status)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def route_path(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if self._paths is None:
+            self._paths = {getattr(r, "endpoint", None): r.path for r in scope["app"].routes}
+        return self._paths.get(endpoint, "unmatched")
@@ -0,0 +1,202 @@
+"""
+Concrete meeting dates of the weekly class events.
+
+A class event (calendarmaker.iter_class_events) meets on its BYDAY weekdays
+from the term start, aligned to the earliest of those days
+(align_earliest_day), through the term end. For a batch of events:
+
+    with_exdates(events)    => the events plus an "exdate" list for the meetings
+                               that fall on academic holidays (icswriter EXDATE)
+    expand_events(events)   => one event per meeting that is not a holiday,
+                               without RRULE, for clients that ignore EXDATE
+                               (terms over MAX_EXPAND_DAYS keep RRULE + EXDATE)
+
+A paste only has a few distinct terms and weekday patterns, so the holidays
+and meeting days are worked out once per (term start, term end, BYDAY) with
+plain date arithmetic and cached; a render then costs a dict lookup per event.
+
+HOLIDAYS_FILE replaces the built-in UC holiday rules with a list of dates
+("2025-11-11", one per line, "#" starts a comment), e.g. for campus closures.
+"""
+import hashlib
+import os
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+
+from calendarmaker import PY_DAY_MAP, align_earliest_day, ics_date
+
+HOLIDAYS_FILE = os.environ.get("HOLIDAYS_FILE")
+# longest term (in days) expand_events writes out meeting by meeting; longer
+# ones (e.g. a pasted end date of 12/31/2300) stay one RRULE + EXDATE event
+MAX_EXPAND_DAYS = int(os.environ.get("MAX_EXPAND_DAYS", "366"))
+# years covered by the built-in table
+HOLIDAY_YEARS = range(2020, 2041)
+
+_holidays = None
+_holidays_fingerprint = None
+
+
+def nth_weekday(year, month, weekday, n):
+    """
+    n-th (1-based, or -1 for the last) weekday of a month,
+    e.g. (2026, 1, 0, 3) => date(2026, 1, 19), the third Monday.
+    """
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+def observed(d):
+    """
+    Saturday holidays are observed on the Friday, Sunday ones on the Monday.
+    """
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+def uc_holidays(year):
+    """
+    e.g. 2025 => [date(2025,1,1), date(2025,1,20), ..., date(2025,12,31)]
+    University of California holidays: no classes meet on these days.
+    """
+    thanksgiving = nth_weekday(year, 11, 3, 4)
+    return sorted({
+        observed(date(year, 1, 1)),
+        nth_weekday(year, 1, 0, 3),    # Martin Luther King Jr. Day
+        nth_weekday(year, 2, 0, 3),    # Presidents' Day
+        observed(date(year, 3, 31)),   # César Chávez Day
+        nth_weekday(year, 5, 0, -1),   # Memorial Day
+        observed(date(year, 6, 19)),   # Juneteenth
+        observed(date(year, 7, 4)),
+        nth_weekday(year, 9, 0, 1),    # Labor Day
+        observed(date(year, 11, 11)),  # Veterans Day
+        thanksgiving,
+        thanksgiving + timedelta(days=1),
+        observed(date(year, 12, 24)),
+        observed(date(year, 12, 25)),
+        observed(date(year, 12, 31)),
+    })
+
+def read_holidays(path):
+    days = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                days.append(line)
+    return days
+
+def holiday_table():
+    """
+    Sorted tuple of unique holiday dates, built on first use.
+    """
+    global _holidays
+    if _holidays is None:
+        if HOLIDAYS_FILE:
+            days = read_holidays(HOLIDAYS_FILE)
+        else:
+            days = [d for year in HOLIDAY_YEARS for d in uc_holidays(year)]
+        set_holidays(days)
+    return _holidays
+
+def set_holidays(days):
+    """
+    Replace the holiday table (dates or ISO strings).
+    """
+    global _holidays, _holidays_fingerprint
+    _holidays = tuple(sorted({d if isinstance(d, date) else date.fromisoformat(d) for d in days}))
+    _holidays_fingerprint = None
+    holiday_dates.cache_clear()
+    meeting_dates.cache_clear()
+
+def holidays_fingerprint():
+    """
+    Short hash of the holiday table, e.g. "1c9e04a2"; part of the calendar
+    cache keys and ETags so a new HOLIDAYS_FILE is never answered from the old one.
+    """
+    global _holidays_fingerprint
+    if _holidays_fingerprint is None:
+        table = ",".join(d.isoformat() for d in holiday_table())
+        _holidays_fingerprint = hashlib.sha1(table.encode()).hexdigest()[:8]
+    return _holidays_fingerprint
+
+@lru_cache(maxsize=1024)
+def parse_ics_date(ics_day):
+    """
+    e.g. "20250106" => date(2025, 1, 6)
+    """
+    return date(int(ics_day[:4]), int(ics_day[4:6]), int(ics_day[6:8]))
+
+def term_days(fields):
+    return (parse_ics_date(fields["term_end"]) - parse_ics_date(fields["term_start"])).days
+
+@lru_cache(maxsize=1024)
+def holiday_dates(term_start, term_end, byday):
+    """
+    Holiday meetings of a weekly class, e.g.
+    ("20250106", "20250314", "MO,WE,FR") => ("20250120", "20250217")
+    """
+    first = align_earliest_day(parse_ics_date(term_start), byday.split(","))
+    last = parse_ics_date(term_end)
+    weekdays = {PY_DAY_MAP[d] for d in byday.split(",")}
+    table = holiday_table()
+    return tuple(
+        ics_date(d) for d in table[bisect_left(table, first):bisect_right(table, last)]
+        if d.weekday() in weekdays
+    )
+
+@lru_cache(maxsize=256)
+def meeting_dates(term_start, term_end, byday):
+    """
+    Every meeting of a weekly class that is not a holiday, e.g.
+    ("20250106", "20250314", "MO,WE,FR") => ("20250106", "20250108", ...)
+    """
+    first = align_earliest_day(parse_ics_date(term_start), byday.split(","))
+    last = parse_ics_date(term_end)
+    weekdays = {PY_DAY_MAP[d] for d in byday.split(",")}
+    holidays = set(holiday_dates(term_start, term_end, byday))
+    days = (first + timedelta(days=i) for i in range((last - first).days + 1))
+    return tuple(
+        day for day in (ics_date(d) for d in days if d.weekday() in weekdays)
+        if day not in holidays
+    )
+
+def with_exdates(events):
+    """
+    Event fields => the same events, those with holiday meetings copied with
+    "exdate": ["20251111T160000", ...] (local, same time of day as DTSTART).
+    """
+    out = []
+    for fields in events:
+        days = holiday_dates(fields["term_start"], fields["term_end"], fields["byday"])
+        if days:
+            time_of_day = fields["dtstart"][8:]
+            fields = {**fields, "exdate": [day + time_of_day for day in days]}
+        out.append(fields)
+    return out
+
+def expand_events(events):
+    """
+    Event fields => one event per meeting (no RRULE), each with its
+    "occurrence" day, e.g. "20250106", for a distinct UID. Events whose term
+    is longer than MAX_EXPAND_DAYS are kept as one event, with_exdates.
+    """
+    out = []
+    for fields in events:
+        if term_days(fields) > MAX_EXPAND_DAYS:
+            out.extend(with_exdates([fields]))
+            continue
+        start_time, end_time = fields["dtstart"][8:], fields["dtend"][8:]
+        for day in meeting_dates(fields["term_start"], fields["term_end"], fields["byday"]):
+            out.append({
+                **fields,
+                "dtstart": day + start_time,
+                "dtend": day + end_time,
+                "rrule": None,
+                "occurrence": day,
+            })
+    return out
@@ -0,0 +1,505 @@
+"""
+Parse -> render steps shared by the API endpoints.
+
+The CPU-bound work runs in a bounded process pool; the web process only
+does cache lookups and bookkeeping on the event loop. Functions handed
+to the pool take and return plain picklable values.
+"""
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+
+from starlette.concurrency import iterate_in_threadpool
+
+import metrics
+from cache import LRUCache, SqliteBackend, schedule_key
+from catalog import catalog_fingerprint
+from calendarmaker import iter_class_events
+from conflicts import find_conflicts
+from icswriter import RENDER_VERSION, iter_calendar_chunks, render_events
+from occurrences import holidays_fingerprint
+from textparser import PARSER_VERSION, iter_courses, select_onlyenrolledcourses
+from textparser import t as SAMPLE_SCHEDULE
+
+# Parse/render worker processes; defaults to one per CPU (serve.py divides the
+# CPUs between its web workers). 0 = use threads instead.
+PIPELINE_WORKERS = int(os.environ.get("PIPELINE_WORKERS", os.cpu_count() or 1))
+# Jobs running in the pool at once, and how many more may wait for a slot
+# before requests are turned away with a 503.
+MAX_CONCURRENCY = int(os.environ.get("MAX_CONCURRENCY", "0")) or max(PIPELINE_WORKERS, 1) * 2
+MAX_QUEUE = int(os.environ.get("MAX_QUEUE", "100"))
+# Admission slots one batch request (/parseSchedules, /conflicts, /freeTime)
+# may hold at once; the rest stay free for single-schedule requests.
+BATCH_INFLIGHT = int(os.environ.get("BATCH_INFLIGHT", "0")) or max(MAX_CONCURRENCY // 2, 1)
+# Pastes at least this many characters are parsed and rendered while the
+# response streams out, instead of being rendered whole in the pool.
+STREAM_THRESHOLD = int(os.environ.get("STREAM_THRESHOLD", str(64 * 1024)))
+
+# Result caches: entries per layer, seconds to live, optional sqlite file to persist to.
+CACHE_SIZE = int(os.environ.get("CACHE_SIZE", "2048"))
+CACHE_TTL = int(os.environ.get("CACHE_TTL", "3600"))
+CACHE_DB = os.environ.get("CACHE_DB")
+
+_cache_backend = SqliteBackend(CACHE_DB) if CACHE_DB else None
+# "<schedule_key>:p<PARSER_VERSION>:c<catalog>" -> every parsed Course (the enrolled filter is applied on the way out)
+PARSED_CACHE = LRUCache("courses", CACHE_SIZE, CACHE_TTL, _cache_backend)
+# "<schedule_key>:<0|1 only enrolled>:p<PARSER_VERSION>v<RENDER_VERSION>:h<holidays>:c<catalog>" -> ICS text
+ICS_CACHE = LRUCache("ics", CACHE_SIZE, CACHE_TTL, _cache_backend)
+
+_pool = None
+# pids of pool workers that finished warm_worker (see get_pool / warm_up)
+_ready = None
+# seconds warm_up waits for every pool worker to report in
+WARM_TIMEOUT = float(os.environ.get("WARM_TIMEOUT", "120"))
+
+
+class Overloaded(Exception):
+    """
+    Raised when MAX_CONCURRENCY jobs are running and MAX_QUEUE more are waiting,
+    or when the pool broke again while retrying a job (see run_in_pool).
+    """
+
+
+class AdmissionLimiter:
+    """
+    Semaphore with a bounded wait queue: callers past the queue are rejected
+    right away instead of piling up latency for everyone.
+    Only used from the event loop, so the counter needs no lock.
+    """
+    def __init__(self, concurrency, queue_depth):
+        self.concurrency = concurrency
+        self.queue_depth = queue_depth
+        self.pending = 0
+        self._sem = asyncio.Semaphore(concurrency)
+
+    def check(self):
+        """
+        Raise Overloaded if a new caller would be rejected right now.
+        """
+        if self.pending >= self.concurrency + self.queue_depth:
+            raise Overloaded()
+
+    async def acquire(self):
+        self.check()
+        self.pending += 1
+        try:
+            await self._sem.acquire()
+        except BaseException:
+            self.pending -= 1
+            raise
+
+    def release(self):
+        self._sem.release()
+        self.pending -= 1
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+
+LIMITER = AdmissionLimiter(MAX_CONCURRENCY, MAX_QUEUE)
+
+
+def parse_cache_key(key):
+    # a new parser version or catalog (rows resolve through it) means a new parse
+    return f"{key}:p{PARSER_VERSION}:c{catalog_fingerprint()}"
+
+def ics_cache_key(key, only_enrolled, expanded=False):
+    return f"{key}:{int(only_enrolled)}{':x' if expanded else ''}:p{PARSER_VERSION}v{RENDER_VERSION}:h{holidays_fingerprint()}:c{catalog_fingerprint()}"
+
+def ics_etag(key, only_enrolled, expanded=False):
+    """
+    Strong ETag of the calendar for a schedule_key. Rendering is deterministic,
+    so this is known before (and without) rendering.
+    """
+    return f'"{key[:40]}-{int(only_enrolled)}{"x" if expanded else ""}-p{PARSER_VERSION}v{RENDER_VERSION}-h{holidays_fingerprint()}-c{catalog_fingerprint()}"'
+
+def courses_etag(key, only_enrolled):
+    """
+    Strong ETag of the parsed-courses JSON for a schedule_key.
+    """
+    return f'"{key[:40]}-{int(only_enrolled)}-p{PARSER_VERSION}-c{catalog_fingerprint()}-courses"'
+
+# ---- pool-side work: plain functions of plain values ----
+# Each returns its result plus a stats dict (stage seconds and item counts)
+# for metrics.record_render, since timings taken in a pool worker have to
+# travel back with the result.
+
+def render_courses(courses, only_enrolled, expanded=False):
+    """
+    => (ICS text of the selected courses, stats); expanded=True writes one
+    event per meeting instead of weekly RRULEs (see occurrences.py)
+    """
+    if only_enrolled:
+        courses = select_onlyenrolledcourses(courses)
+    t0 = time.perf_counter()
+    events = [fields for course in courses for fields in iter_class_events(course)]
+    t1 = time.perf_counter()
+    ics_text = render_events(events, expanded)
+    t2 = time.perf_counter()
+    return ics_text, {
+        "events": t1 - t0,
+        "serialize": t2 - t1,
+        "n_courses": len(courses),
+        # a class with no event was skipped (TBA, unparseable days/times/dates)
+        "n_classes": sum(len(course.classes) for course in courses),
+        "n_events": len(events),
+    }
+
+def parse_only(schedule_text):
+    """
+    => (every parsed course, stats) -- for the JSON output, no calendar is built.
+    """
+    t0 = time.perf_counter()
+    courses = list(iter_courses(schedule_text))
+    return courses, {
+        "parse": time.perf_counter() - t0,
+        "n_courses": len(courses),
+        "n_classes": sum(len(course.classes) for course in courses),
+    }
+
+def parse_and_render(schedule_text, only_enrolled, expanded=False):
+    """
+    => (every parsed course, ICS text of the selected ones, stats)
+    """
+    t0 = time.perf_counter()
+    courses = list(iter_courses(schedule_text))
+    parse_seconds = time.perf_counter() - t0
+    ics_text, stats = render_courses(courses, only_enrolled, expanded)
+    stats["parse"] = parse_seconds
+    return courses, ics_text, stats
+
+# ---- in-process, cached versions ----
+
+def parse_courses(schedule_text, only_enrolled, key=None):
+    """
+    Pasted schedule text => list of Course records, through PARSED_CACHE.
+    The records are immutable, so sharing them with the cache is safe.
+    """
+    key = key or schedule_key(schedule_text)
+    courses = PARSED_CACHE.get(parse_cache_key(key))
+    if courses is None:
+        courses = list(iter_courses(schedule_text))
+        PARSED_CACHE.set(parse_cache_key(key), courses)
+    if only_enrolled:
+        return select_onlyenrolledcourses(courses)
+    return courses
+
+def render_schedule_stats(schedule_text, only_enrolled, key=None, expanded=False):
+    """
+    Pasted schedule text => (ICS text, stats or None on a cache hit), through ICS_CACHE.
+    """
+    key = key or schedule_key(schedule_text)
+    ics_key = ics_cache_key(key, only_enrolled, expanded)
+    ics_text = ICS_CACHE.get(ics_key)
+    if ics_text is not None:
+        return ics_text, None
+
+    courses = PARSED_CACHE.get(parse_cache_key(key))
+    if courses is None:
+        courses, ics_text, stats = parse_and_render(schedule_text, only_enrolled, expanded)
+        PARSED_CACHE.set(parse_cache_key(key), courses)
+    else:
+        ics_text, stats = render_courses(courses, only_enrolled, expanded)
+    ICS_CACHE.set(ics_key, ics_text)
+    return ics_text, stats
+
+def render_schedule(schedule_text, only_enrolled, key=None, expanded=False):
+    """
+    Pasted schedule text => ICS text, through ICS_CACHE.
+    """
+    return render_schedule_stats(schedule_text, only_enrolled, key, expanded)[0]
+
+def _render_schedule_args(args):
+    return render_schedule_stats(*args)
+
+def schedule_conflicts(schedule_text, only_enrolled, key=None):
+    """
+    Pasted schedule text => conflicts.find_conflicts of its calendar's classes.
+    """
+    return find_conflicts(parse_courses(schedule_text, only_enrolled, key), only_enrolled)
+
+def _schedule_conflicts_args(args):
+    return schedule_conflicts(*args)
+
+def schedule_occupancy(schedule_text, only_enrolled, key=None):
+    """
+    Pasted schedule text => freetime.occupancy bitset of its calendar's classes.
+    """
+    # NumPy: only loaded once free time is asked for
+    import freetime
+    return freetime.occupancy(parse_courses(schedule_text, only_enrolled, key), only_enrolled)
+
+def _schedule_occupancy_args(args):
+    return schedule_occupancy(*args)
+
+# ---- the pool ----
+
+def get_pool():
+    """
+    The shared process pool, started on first use (None when PIPELINE_WORKERS=0).
+    Workers are spawned, not forked, so they never inherit the event loop's threads,
+    and each runs warm_worker before taking any job.
+    """
+    global _pool, _ready
+    if _pool is None and PIPELINE_WORKERS > 0:
+        ctx = multiprocessing.get_context("spawn")
+        _ready = ctx.Queue()
+        _pool = ProcessPoolExecutor(
+            max_workers=PIPELINE_WORKERS,
+            mp_context=ctx,
+            initializer=warm_worker,
+            initargs=(_ready,),
+        )
+    return _pool
+
+def shutdown_pool():
+    global _pool, _ready
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+        _ready = None
+
+def pool_broken():
+    """
+    True once a pool worker died (OOM kill, segfault): the executor then
+    fails every job, so it has to be replaced.
+    """
+    return _pool is not None and getattr(_pool, "_broken", False)
+
+def reset_pool(pool):
+    """
+    Drop a broken pool so the next get_pool() starts a fresh one; a no-op
+    if another caller already replaced it.
+    """
+    global _pool, _ready
+    if pool is not None and pool is _pool:
+        _pool = None
+        _ready = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+async def run_in_pool(fn, *args):
+    """
+    Await fn(*args) in the process pool (or a thread when there is no pool).
+    A broken pool is replaced and the job retried once; if that breaks
+    too, Overloaded (503) rather than an error on every later request.
+    """
+    loop = asyncio.get_running_loop()
+    for attempt in range(2):
+        pool = get_pool()
+        try:
+            return await loop.run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            reset_pool(pool)
+    raise Overloaded()
+
+async def render_schedule_async(schedule_text, only_enrolled, key=None, expanded=False):
+    """
+    Event-loop version of render_schedule: cache lookups happen here, only
+    misses take an admission slot and go to the pool. Raises Overloaded.
+    """
+    key = key or schedule_key(schedule_text)
+    ics_key = ics_cache_key(key, only_enrolled, expanded)
+    ics_text = ICS_CACHE.get(ics_key)
+    if ics_text is not None:
+        return ics_text
+
+    courses = PARSED_CACHE.get(parse_cache_key(key))
+    async with LIMITER.slot():
+        if courses is None:
+            courses, ics_text, stats = await run_in_pool(parse_and_render, schedule_text, only_enrolled, expanded)
+            PARSED_CACHE.set(parse_cache_key(key), courses)
+        else:
+            ics_text, stats = await run_in_pool(render_courses, courses, only_enrolled, expanded)
+    metrics.record_render(stats)
+    ICS_CACHE.set(ics_key, ics_text)
+    return ics_text
+
+async def parse_courses_async(schedule_text, only_enrolled, key=None):
+    """
+    Event-loop version of parse_courses: cache hits return right away,
+    misses take an admission slot and parse in the pool. Raises Overloaded.
+    """
+    key = key or schedule_key(schedule_text)
+    courses = PARSED_CACHE.get(parse_cache_key(key))
+    if courses is None:
+        async with LIMITER.slot():
+            courses, stats = await run_in_pool(parse_only, schedule_text)
+        metrics.record_render(stats)
+        PARSED_CACHE.set(parse_cache_key(key), courses)
+    if only_enrolled:
+        return select_onlyenrolledcourses(courses)
+    return courses
+
+async def stream_courses(schedule_text, only_enrolled, key=None):
+    """
+    Async iterator of parsed courses for the NDJSON output. Cached pastes are
+    replayed from PARSED_CACHE; otherwise, like stream_schedule, admission is
+    checked now (raises Overloaded) and each course is yielded as it is parsed.
+    """
+    key = key or schedule_key(schedule_text)
+    courses = PARSED_CACHE.get(parse_cache_key(key))
+    if courses is not None:
+        if only_enrolled:
+            courses = select_onlyenrolledcourses(courses)
+
+        async def cached():
+            for course in courses:
+                yield course
+        return cached()
+
+    LIMITER.check()
+
+    async def parsed():
+        start = time.perf_counter()
+        try:
+            async with LIMITER.slot():
+                async for course in iterate_in_threadpool(iter_courses(schedule_text, only_enrolled)):
+                    yield course
+        finally:
+            metrics.STAGE_SECONDS.observe("stream", time.perf_counter() - start)
+    return parsed()
+
+async def stream_schedule(schedule_text, only_enrolled, expanded=False):
+    """
+    Check admission now (raises Overloaded), then return an async iterator
+    of ICS chunks. Parsing, event creation and serialization are generators
+    end to end, advanced one chunk at a time in a worker thread.
+    The admission slot is only taken once the response starts iterating and
+    is released when the stream ends, so a response that is never sent
+    (error or disconnect before the first chunk) holds nothing.
+    """
+    LIMITER.check()
+
+    async def chunks():
+        start = time.perf_counter()
+        try:
+            async with LIMITER.slot():
+                courses = iter_courses(schedule_text, only_enrolled)
+                async for chunk in iterate_in_threadpool(iter_calendar_chunks(courses, expanded=expanded)):
+                    yield chunk
+        finally:
+            # parse, events and serialize interleave here, so they are timed as one
+            metrics.STAGE_SECONDS.observe("stream", time.perf_counter() - start)
+
+    return chunks()
+
+def run_jobs(fn, jobs):
+    return [fn(job) for job in jobs]
+
+async def map_jobs(fn, jobs):
+    """
+    [fn(job) for job in jobs], fanned out across the process pool in chunks
+    (fn must take one args tuple and be picklable); tiny batches run as one
+    chunk since pickling them over would cost more than running them.
+    Every chunk in flight holds an admission slot, and one batch has at most
+    BATCH_INFLIGHT chunks in flight, so it queues with single-schedule
+    requests instead of taking over the pool. Raises Overloaded.
+    """
+    jobs = list(jobs)
+    if len(jobs) < 2 or get_pool() is None:
+        async with LIMITER.slot():
+            if get_pool() is None:
+                return await asyncio.to_thread(run_jobs, fn, jobs)
+            return await run_in_pool(run_jobs, fn, jobs)
+
+    LIMITER.check()
+    # a few chunks per worker keeps them all busy without per-item IPC
+    chunksize = max(1, len(jobs) // (PIPELINE_WORKERS * 4))
+    inflight = asyncio.Semaphore(BATCH_INFLIGHT)
+
+    async def run_chunk(chunk):
+        async with inflight, LIMITER.slot():
+            return await run_in_pool(run_jobs, fn, chunk)
+
+    tasks = [asyncio.ensure_future(run_chunk(jobs[i:i + chunksize])) for i in range(0, len(jobs), chunksize)]
+    try:
+        chunks = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+    return [result for chunk in chunks for result in chunk]
+
+async def render_schedules(jobs):
+    """
+    [(schedule_text, only_enrolled), ...] => [ics_text, ...] in the same order.
+    """
+    results = await map_jobs(_render_schedule_args, jobs)
+    calendars = []
+    for ics_text, stats in results:
+        metrics.record_render(stats)
+        calendars.append(ics_text)
+    return calendars
+
+async def conflicts_batch(jobs):
+    """
+    [(schedule_text, only_enrolled), ...] => [conflicts, ...] in the same order.
+    """
+    return await map_jobs(_schedule_conflicts_args, jobs)
+
+async def occupancy_batch(jobs):
+    """
+    [(schedule_text, only_enrolled), ...] => [busy bitset, ...] in the same order.
+    """
+    return await map_jobs(_schedule_occupancy_args, jobs)
+
+# ---- warm-up ----
+
+def warm_worker(ready=None):
+    """
+    Parse and render the sample schedule once so imports, compiled regexes
+    and lookup tables are loaded before the first real request.
+    Runs in the web process and, as the pool initializer, in every pool
+    worker, which then reports its pid on `ready`; caches are left alone.
+    """
+    _, ics_text, _ = parse_and_render(SAMPLE_SCHEDULE, False)
+    if ready is not None:
+        ready.put(os.getpid())
+    return len(ics_text)
+
+def worker_pid(_=None):
+    return os.getpid()
+
+def warm_up():
+    """
+    Warm this process, start every pool worker and wait until each has
+    warmed itself. Blocking: call it from a thread.
+    """
+    warm_worker()
+    pool = get_pool()
+    if pool is not None:
+        # workers are spawned on demand: one job per worker up front starts all of them
+        list(pool.map(worker_pid, range(PIPELINE_WORKERS)))
+        # jobs only reach workers that are already warm, so wait for each one's report
+        for _ in range(PIPELINE_WORKERS):
+            _ready.get(timeout=WARM_TIMEOUT)
+
+def cache_stats():
+    return {"parsed": PARSED_CACHE.stats(), "ics": ICS_CACHE.stats()}
+
+def metrics_lines():
+    """
+    Cache and admission gauges for /metrics, read at scrape time.
+    """
+    yield "# HELP schedule_cache_events_total Cache lookups and evictions per cache layer."
+    yield "# TYPE schedule_cache_events_total counter"
+    stats = cache_stats()
+    for name, s in stats.items():
+        for event in ("hits", "misses", "evictions"):
+            yield f'schedule_cache_events_total{{cache="{name}",event="{event}"}} {s[event]}'
+    yield "# HELP schedule_cache_entries Entries held per cache layer."
+    yield "# TYPE schedule_cache_entries gauge"
+    for name, s in stats.items():
+        yield f'schedule_cache_entries{{cache="{name}"}} {s["size"]}'
+    yield "# HELP schedule_jobs_pending Render jobs running or queued for an admission slot."
+    yield "# TYPE schedule_jobs_pending gauge"
+    yield f"schedule_jobs_pending {LIMITER.pending}"
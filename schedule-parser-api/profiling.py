@@ -0,0 +1,96 @@
+"""
+Opt-in profiling of single /parseSchedule requests.
+
+Off unless PROFILE_REQUESTS is set; its value is the admin token a request
+must send in the X-Profile header. A profiled request is parsed and rendered
+inline (no cache, no pool) under pyinstrument if it is installed, else
+cProfile, and the profile is written to PROFILE_DIR for GET /profiles/{id}:
+
+    curl -H "X-Profile: $TOKEN" -d @slow.json localhost:8000/parseSchedule -D -   # X-Profile-Id: ...
+    curl -H "X-Profile: $TOKEN" -O localhost:8000/profiles/<id>
+
+cProfile output (.prof) opens with `python -m pstats` or snakeviz;
+pyinstrument output is a self-contained .html page.
+"""
+import hmac
+import os
+import re
+import tempfile
+import threading
+import uuid
+
+PROFILE_TOKEN = os.environ.get("PROFILE_REQUESTS")
+PROFILE_DIR = os.environ.get("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "schedule-profiles")
+# profiles kept on disk; the oldest are removed past this
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+
+MEDIA_TYPES = {".html": "text/html", ".prof": "application/octet-stream"}
+_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+# only one profiler can be active per process
+_lock = threading.Lock()
+
+
+def enabled(header_token):
+    """
+    True when profiling is configured and the request carries the token.
+    """
+    if not PROFILE_TOKEN or not header_token:
+        return False
+    return hmac.compare_digest(header_token.encode(), PROFILE_TOKEN.encode())
+
+def profile_call(fn, *args):
+    """
+    Run fn(*args) under a profiler => (result, profile id).
+    Blocking: call it from a thread.
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = uuid.uuid4().hex
+    with _lock:
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            Profiler = None
+
+        if Profiler is not None:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                result = fn(*args)
+            finally:
+                profiler.stop()
+            with open(os.path.join(PROFILE_DIR, profile_id + ".html"), "w") as f:
+                f.write(profiler.output_html())
+        else:
+            import cProfile
+
+            profiler = cProfile.Profile()
+            try:
+                result = profiler.runcall(fn, *args)
+            finally:
+                profiler.dump_stats(os.path.join(PROFILE_DIR, profile_id + ".prof"))
+    prune()
+    return result, profile_id
+
+def profile_file(profile_id):
+    """
+    => (path, media type) of a stored profile, or None.
+    """
+    if not _ID_RE.match(profile_id):
+        return None
+    for ext, media_type in MEDIA_TYPES.items():
+        path = os.path.join(PROFILE_DIR, profile_id + ext)
+        if os.path.exists(path):
+            return path, media_type
+    return None
+
+def prune():
+    try:
+        entries = [e for e in os.scandir(PROFILE_DIR) if os.path.splitext(e.name)[1] in MEDIA_TYPES]
+    except FileNotFoundError:
+        return
+    entries.sort(key=lambda e: e.stat().st_mtime)
+    for e in entries[:max(0, len(entries) - PROFILE_KEEP)]:
+        try:
+            os.remove(e.path)
+        except FileNotFoundError:
+            pass
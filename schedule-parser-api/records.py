@@ -0,0 +1,91 @@
+"""
+The one schema for parsed schedules, shared by the parser (textparser),
+the event builder (calendarmaker) and the API models (main).
+
+Slotted, frozen dataclasses: small, cheap to build, safe to share through
+the caches. to_dict()/from_dict() convert to and from the original
+{"title", "code", "name", "metadata": {...}, "classes": [...]} dict shape.
+"""
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class ClassInfo:
+    """
+    One row of a course's class table, e.g. the Lecture or a Discussion section.
+    """
+    class_nbr: str
+    section: str
+    component: str
+    days_times: str
+    room: str
+    instructor: str
+    start_end: str
+
+    def to_dict(self):
+        return {
+            "class_nbr": self.class_nbr,
+            "section": self.section,
+            "component": self.component,
+            "days_times": self.days_times,
+            "room": self.room,
+            "instructor": self.instructor,
+            "start_end": self.start_end,
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class CourseMetadata:
+    status: Optional[str] = None
+    units: Optional[str] = None
+    grading: Optional[str] = None
+    grade: Optional[str] = None
+    general_education: Optional[str] = None
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "units": self.units,
+            "grading": self.grading,
+            "grade": self.grade,
+            "general_education": self.general_education,
+        }
+
+
+EMPTY_METADATA = CourseMetadata()
+
+
+@dataclass(frozen=True, slots=True)
+class Course:
+    title: str
+    code: str
+    name: str
+    metadata: CourseMetadata = EMPTY_METADATA
+    classes: Tuple[ClassInfo, ...] = ()
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "code": self.code,
+            "name": self.name,
+            "metadata": self.metadata.to_dict(),
+            "classes": [c.to_dict() for c in self.classes],
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        """
+        Inverse of to_dict; missing keys fall back to the defaults.
+        """
+        return cls(
+            title=d.get("title", ""),
+            code=d.get("code", ""),
+            name=d.get("name", ""),
+            metadata=CourseMetadata(**d.get("metadata") or {}),
+            classes=tuple(ClassInfo(**c) for c in d.get("classes", ())),
+        )
+
+
+def courses_to_dicts(courses):
+    return [c.to_dict() for c in courses]
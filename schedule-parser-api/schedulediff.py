@@ -0,0 +1,88 @@
+"""
+Diff two parses of a student's schedule into the minimal event delta.
+
+Meetings are keyed by (class number, section). A class is in the calendar
+exactly when /parseSchedule and /exportGoogleCalendar would include it:
+every course, or with only_enrolled the Enrolled ones, so dropping a
+section mid-quarter shows up as a removal under only_enrolled even though
+the paste still lists it.
+
+    added    in the new schedule only                     => new VEVENT (with SEQUENCE, in
+                                                             case it was cancelled before)
+    changed  same UID, different time/room/title/...       => VEVENT with a higher SEQUENCE
+    removed  gone, dropped, or its UID changed (new days)  => STATUS:CANCELLED VEVENT
+
+The delta renders as an ICS (icswriter) or goes to gcal as upserts/deletes.
+"""
+from calendarmaker import iter_class_events
+from icswriter import event_id, event_uid, render_events
+
+# event fields that make an update visible to the student
+COMPARED_FIELDS = ("summary", "description", "location", "dtstart", "dtend", "rrule")
+
+
+def in_calendar(course, only_enrolled=False):
+    """
+    Same selection as the render path (textparser.select_onlyenrolledcourses).
+    """
+    return not only_enrolled or course.metadata.status == "Enrolled"
+
+def class_events(courses, only_enrolled=False):
+    """
+    Courses => {(class_nbr, section): event fields} for the classes in the calendar.
+    """
+    events = {}
+    for course in courses:
+        if in_calendar(course, only_enrolled):
+            for fields in iter_class_events(course):
+                events[(fields["class_nbr"], fields["section"])] = fields
+    return events
+
+def diff_events(old, new):
+    """
+    Two class_events maps => {"added": [...], "changed": [...], "removed": [...]},
+    each a list of event fields sorted by (class_nbr, section).
+    """
+    delta = {"added": [], "changed": [], "removed": []}
+    for key in sorted(old.keys() | new.keys()):
+        before, after = old.get(key), new.get(key)
+        if before is None:
+            delta["added"].append(after)
+        elif after is None:
+            delta["removed"].append(before)
+        elif event_id(before) != event_id(after):
+            # days or term dates changed: the UID follows them, so replace the event
+            delta["removed"].append(before)
+            delta["added"].append(after)
+        elif any(before[f] != after[f] for f in COMPARED_FIELDS):
+            delta["changed"].append(after)
+    return delta
+
+def diff_schedules(old_courses, new_courses, only_enrolled=False):
+    return diff_events(class_events(old_courses, only_enrolled), class_events(new_courses, only_enrolled))
+
+def delta_events(delta, sequence):
+    """
+    Event fields for the delta ICS: every event carries `sequence` so calendar
+    clients replace the copy they imported earlier, including a cancelled
+    event that is added back.
+    """
+    events = [{**fields, "sequence": sequence} for fields in delta["added"]]
+    events += [{**fields, "sequence": sequence} for fields in delta["changed"]]
+    events += [{**fields, "sequence": sequence, "status": "CANCELLED"} for fields in delta["removed"]]
+    return events
+
+def render_delta(delta, sequence):
+    return render_events(delta_events(delta, sequence))
+
+def delta_summary(delta):
+    """
+    e.g. {"added": [{"uid": ..., "class_nbr": "30481", "section": "01", "summary": ...}], ...}
+    """
+    return {
+        kind: [
+            {"uid": event_uid(f), "class_nbr": f["class_nbr"], "section": f["section"], "summary": f["summary"]}
+            for f in fields
+        ]
+        for kind, fields in delta.items()
+    }
@@ -0,0 +1,66 @@
+"""
+Production entry point: uvicorn with several worker processes.
+
+    python serve.py
+
+Each worker imports the app and warms the parser, the calendar writer and
+its pool workers in the lifespan before it accepts connections; GET /ready
+reports 200 after that. Settings come from the environment:
+
+    PORT              port to listen on (default 8000)
+    HOST              interface to bind (default 0.0.0.0)
+    WEB_CONCURRENCY   uvicorn workers (default: available CPUs)
+    PIPELINE_WORKERS  process pool per web worker (default: available CPUs
+                      divided by WEB_CONCURRENCY, at least 1)
+    FORWARDED_ALLOW_IPS  proxies whose X-Forwarded-* headers are trusted for
+                      the client address (default 127.0.0.1, as in uvicorn;
+                      "*" only when nothing but the proxy can reach the port)
+
+so web workers x pool size stays near the CPU count. "Available" honours
+CPU affinity and a cgroup (container) CPU quota; benchmarks/loadtest.py
+sweep measures the best split.
+"""
+import math
+import os
+
+import uvicorn
+
+
+def available_cpus():
+    """
+    CPUs this process may use: the affinity mask, capped by a cgroup v2 quota
+    (e.g. "cpu.max" of "200000 100000" => 2).
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(cpus, 1)
+
+
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", "8000"))
+CPUS = available_cpus()
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", "0")) or CPUS
+# read by pipeline.py in each web worker; an explicit 0 (threads) is kept
+PIPELINE_WORKERS = int(os.environ.get("PIPELINE_WORKERS") or max(1, CPUS // WEB_CONCURRENCY))
+FORWARDED_ALLOW_IPS = os.environ.get("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+if __name__ == "__main__":
+    os.environ["PIPELINE_WORKERS"] = str(PIPELINE_WORKERS)
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS,
+    )
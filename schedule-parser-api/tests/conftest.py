@@ -0,0 +1,17 @@
+import os
+import sys
+
+# the app's modules are top-level files next to this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# a small pool keeps the TestClient lifespan (warm-up) quick
+os.environ.setdefault("PIPELINE_WORKERS", "2")
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def client():
+    import main
+    with TestClient(main.app) as c:
+        yield c
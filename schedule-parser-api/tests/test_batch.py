@@ -0,0 +1,48 @@
+import asyncio
+import io
+import zipfile
+
+import pipeline
+from main import ScheduleRequest, batch_names
+from textparser import t as SAMPLE
+
+
+def payloads(student_ids):
+    return [ScheduleRequest(scheduleText=SAMPLE, onlyEnrolledCourses=True, studentId=s) for s in student_ids]
+
+
+def test_batch_names_unique():
+    assert batch_names(payloads(["x", "x_3", "x"])) == ["x", "x_3", "x_4"]
+    assert batch_names(payloads(["a", "a", "a", None])) == ["a", "a_2", "a_3", "schedule_4"]
+
+
+def test_parse_schedules_keeps_every_schedule(client):
+    body = [p.model_dump() for p in payloads(["x", "x_3", "x"])]
+    r = client.post("/parseSchedules?format=json", json=body)
+    assert r.status_code == 200
+    assert sorted(r.json()) == ["x", "x_3", "x_4"]
+
+    r = client.post("/parseSchedules", json=body)
+    assert r.status_code == 200
+    names = zipfile.ZipFile(io.BytesIO(r.content)).namelist()
+    assert sorted(names) == ["x.ics", "x_3.ics", "x_4.ics"]
+
+
+def test_batch_holds_at_most_batch_inflight_slots(monkeypatch):
+    limiter = pipeline.AdmissionLimiter(4, 100)
+    monkeypatch.setattr(pipeline, "LIMITER", limiter)
+    monkeypatch.setattr(pipeline, "BATCH_INFLIGHT", 2)
+    monkeypatch.setattr(pipeline, "get_pool", lambda: object())
+    peak = 0
+
+    async def run_in_pool(fn, *args):
+        nonlocal peak
+        peak = max(peak, limiter.pending)
+        await asyncio.sleep(0.01)
+        return fn(*args)
+    monkeypatch.setattr(pipeline, "run_in_pool", run_in_pool)
+
+    results = asyncio.run(pipeline.map_jobs(sum, [(i, 1) for i in range(40)]))
+    assert results == list(range(1, 41))
+    assert peak == 2
+    assert limiter.pending == 0
@@ -0,0 +1,10 @@
+import pipeline
+
+
+def test_parser_version_in_keys_and_etags(monkeypatch):
+    before = (pipeline.parse_cache_key("k"), pipeline.ics_cache_key("k", True),
+              pipeline.ics_etag("k", True), pipeline.courses_etag("k", True))
+    monkeypatch.setattr(pipeline, "PARSER_VERSION", pipeline.PARSER_VERSION + 1)
+    after = (pipeline.parse_cache_key("k"), pipeline.ics_cache_key("k", True),
+             pipeline.ics_etag("k", True), pipeline.courses_etag("k", True))
+    assert all(a != b for a, b in zip(before, after))
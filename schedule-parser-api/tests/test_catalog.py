@@ -0,0 +1,50 @@
+import catalog
+import textparser
+from textparser import t as SAMPLE
+
+CSV = """class_nbr,code,name,section,component,days_times,room,instructor,start_end
+30481,CSE 111,Adv Programming,01,Lecture,MoWeFr 4:00PM - 5:05PM,Media Theater M110,Ethan Sifferman,01/06/2025 - 03/14/2025
+30476,CSE 115B,Software Design Pro,01,Lecture,TuTh 11:40AM - 1:15PM,Merrill Acad 102,Richard K Jullig,09/25/2025 - 12/12/2025
+"""
+ROW = "30481 01 Lecture MoWeFr 4:00PM - 5:05PM Media Theater M110 Ethan Sifferman 01/06/2025 - 03/14/2025"
+
+
+def use_catalog(monkeypatch, tmp_path):
+    (tmp_path / "term.csv").write_text(CSV)
+    catalog.build_catalog(str(tmp_path / "term.csv"), str(tmp_path / "term.idx"))
+    monkeypatch.setattr(catalog, "_catalog", catalog.Catalog(str(tmp_path / "term.idx")))
+    monkeypatch.setattr(catalog, "_loaded", True)
+
+
+def classes(text):
+    return {cls.class_nbr: cls for course in textparser.iter_courses(text) for cls in course.classes}
+
+
+def test_same_class_in_every_layout(monkeypatch, tmp_path):
+    use_catalog(monkeypatch, tmp_path)
+    stacked = classes(SAMPLE)
+    # the paste's "Ethan  Sifferman" (two spaces) becomes the catalog's spelling
+    assert stacked["30481"].instructor == "Ethan Sifferman"
+    header = SAMPLE[:SAMPLE.index("30481")]
+    row = classes(header + ROW.replace("Ethan Sifferman", "Ethan Q Sifferman"))
+    assert row["30481"] == stacked["30481"]
+
+
+def test_mismatched_class_keeps_the_paste(monkeypatch, tmp_path):
+    use_catalog(monkeypatch, tmp_path)
+    # 30476 is in the catalog for another term: the pasted dates stand
+    assert classes(SAMPLE)["30476"].start_end == "01/06/2025 - 03/14/2025"
+    header = SAMPLE[:SAMPLE.index("30481")]
+    other_section = classes(header + ROW.replace(" 01 Lecture", " 02 Lecture"))["30481"]
+    assert other_section.section == "02"
+
+
+def test_class_numbers_need_catalog(client):
+    nbrs = {"scheduleText": "30481 30476", "onlyEnrolledCourses": False}
+    auth = {"Authorization": "Bearer test-token"}
+    assert client.post("/parseSchedule", json=nbrs).status_code == 422
+    assert client.post("/exportGoogleCalendar", json=nbrs, headers=auth).status_code == 422
+    sync = {**nbrs, "previousScheduleText": SAMPLE}
+    assert client.post("/syncSchedule", json=sync).status_code == 422
+    sync = {"scheduleText": SAMPLE, "previousScheduleText": "30481", "onlyEnrolledCourses": False}
+    assert client.post("/syncSchedule?format=json", json=sync).status_code == 422
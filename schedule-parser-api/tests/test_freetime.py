@@ -0,0 +1,26 @@
+import pytest
+
+import freetime
+from textparser import t as SAMPLE
+
+
+@pytest.mark.parametrize("value, minutes", [("08:00", 480), ("8:05", 485), ("00:00", 0), ("24:00", 1440)])
+def test_parse_hhmm(value, minutes):
+    assert freetime.parse_hhmm(value) == minutes
+
+
+@pytest.mark.parametrize("value", ["8:75", "8:60", "25:00", "24:30", "٠٨:٠٠", "08:٣٠", "8", "8:5", " 8:00", "-1:00", ""])
+def test_parse_hhmm_rejects(value):
+    with pytest.raises(ValueError):
+        freetime.parse_hhmm(value)
+
+
+def test_free_time_bad_day_window(client):
+    schedules = [{"scheduleText": SAMPLE, "onlyEnrolledCourses": True}]
+    for day_start in ("8:75", "٠٨:٠٠"):
+        r = client.post("/freeTime", json={"schedules": schedules, "dayStart": day_start})
+        assert r.status_code == 422
+
+    r = client.post("/freeTime", json={"schedules": schedules, "dayStart": "09:00", "dayEnd": "17:00"})
+    assert r.status_code == 200
+    assert all("09:00" <= w["start"] and w["end"] <= "17:00" for w in r.json()["windows"])
@@ -0,0 +1,59 @@
+import httpx
+import pytest
+
+import fake_gcal
+import gcal
+from textparser import t as SAMPLE
+
+AUTH = {"Authorization": "Bearer test-token"}
+
+
+@pytest.fixture(autouse=True)
+def fake_google(monkeypatch):
+    """
+    Point gcal.py at an in-memory fake_gcal with no events.
+    """
+    monkeypatch.setattr(fake_gcal, "CALENDARS", {})
+    monkeypatch.setattr(gcal, "_client", httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=fake_gcal.app), base_url="http://fake-gcal"))
+    yield fake_gcal.CALENDARS
+
+
+def test_export_twice_updates_instead_of_duplicating(client, fake_google):
+    body = {"scheduleText": SAMPLE, "onlyEnrolledCourses": False}
+    r = client.post("/exportGoogleCalendar", json=body, headers=AUTH)
+    assert r.status_code == 200
+    assert r.json() == {"created": 6, "updated": 0, "failed": []}
+
+    r = client.post("/exportGoogleCalendar", json=body, headers=AUTH)
+    assert r.status_code == 200
+    assert r.json() == {"created": 0, "updated": 6, "failed": []}
+    events = fake_google["primary"].values()
+    assert len(events) == 6
+    assert all(event["sequence"] == 1 for event in events)
+
+
+def test_export_needs_token(client):
+    r = client.post("/exportGoogleCalendar", json={"scheduleText": SAMPLE, "onlyEnrolledCourses": False})
+    assert r.status_code == 401
+
+
+def test_sync_schedule_delta(client, fake_google):
+    client.post("/exportGoogleCalendar", json={"scheduleText": SAMPLE, "onlyEnrolledCourses": False}, headers=AUTH)
+    # a room change on class 30481
+    new = SAMPLE.replace("Media Theater M110", "Baskin Auditorium 101")
+    body = {"scheduleText": new, "previousScheduleText": SAMPLE, "onlyEnrolledCourses": False, "sequence": 2}
+
+    summary = client.post("/syncSchedule?format=json", json=body).json()
+    assert summary["added"] == [] and summary["removed"] == []
+    assert [c["class_nbr"] for c in summary["changed"]] == ["30481"]
+
+    r = client.post("/syncSchedule", json=body)
+    assert r.text.count("BEGIN:VEVENT") == 1
+    assert "LOCATION:Baskin Auditorium 101" in r.text and "SEQUENCE:2" in r.text
+
+    r = client.post("/syncSchedule?format=gcal", json=body, headers=AUTH)
+    assert r.status_code == 200
+    assert r.json()["updated"] == 1 and r.json()["created"] == 0
+    locations = sorted(event["location"] for event in fake_google["primary"].values())
+    assert len(locations) == 6 and "Baskin Auditorium 101" in locations and "Media Theater M110" not in locations
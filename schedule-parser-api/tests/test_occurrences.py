@@ -0,0 +1,61 @@
+from datetime import date
+
+import occurrences
+from calendarmaker import iter_class_events
+from textparser import iter_courses
+from textparser import t as SAMPLE
+
+
+def test_uc_holidays_2025():
+    assert occurrences.uc_holidays(2025) == [
+        date(2025, 1, 1),
+        date(2025, 1, 20),
+        date(2025, 2, 17),
+        date(2025, 3, 31),
+        date(2025, 5, 26),
+        date(2025, 6, 19),
+        date(2025, 7, 4),
+        date(2025, 9, 1),
+        date(2025, 11, 11),
+        date(2025, 11, 27),
+        date(2025, 11, 28),
+        date(2025, 12, 24),
+        date(2025, 12, 25),
+        date(2025, 12, 31),
+    ]
+
+
+def test_chavez_day_observed():
+    # March 31 on a weekend moves to the nearest weekday
+    assert date(2024, 4, 1) in occurrences.uc_holidays(2024)
+    assert date(2029, 3, 30) in occurrences.uc_holidays(2029)
+
+
+def spring_events():
+    spring = SAMPLE.replace("01/06/2025 - 03/14/2025", "03/31/2025 - 06/06/2025")
+    return [fields for course in iter_courses(spring) for fields in iter_class_events(course)]
+
+
+def test_exdates_spring_term():
+    events = occurrences.with_exdates(spring_events())
+    monday = next(f for f in events if "MO" in f["byday"].split(","))
+    assert monday["exdate"][:2] == ["20250331" + monday["dtstart"][8:], "20250526" + monday["dtstart"][8:]]
+
+
+def test_expand_skips_holidays():
+    events = spring_events()
+    expanded = occurrences.expand_events(events)
+    days = {f["occurrence"] for f in expanded}
+    assert "20250331" not in days and "20250526" not in days
+    assert all(f["rrule"] is None for f in expanded)
+    # one event per meeting, in event order
+    assert [f["class_nbr"] for f in expanded] == sorted(
+        (f["class_nbr"] for f in expanded), key=[e["class_nbr"] for e in events].index)
+
+
+def test_expand_keeps_long_terms_recurring():
+    events = spring_events()
+    events[0] = {**events[0], "term_end": "23001231"}
+    expanded = occurrences.expand_events(events)
+    assert expanded[0]["rrule"] == events[0]["rrule"]
+    assert "occurrence" not in expanded[0]
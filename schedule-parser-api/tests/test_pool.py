@@ -0,0 +1,35 @@
+import os
+import signal
+import time
+
+import pipeline
+from textparser import t as SAMPLE
+
+
+def kill_workers():
+    pool = pipeline.get_pool()
+    for pid in list(pool._processes):
+        os.kill(pid, signal.SIGKILL)
+    deadline = time.time() + 10
+    while not pipeline.pool_broken():
+        assert time.time() < deadline, "pool never noticed its workers died"
+        time.sleep(0.05)
+
+
+def test_request_after_worker_killed(client):
+    kill_workers()
+    # a paste nobody rendered yet, so the request has to reach the pool
+    paste = SAMPLE.replace("Ethan  Sifferman", "Ethan  Sifferman-Killed")
+    r = client.post("/parseSchedule", json={"scheduleText": paste, "onlyEnrolledCourses": False})
+    assert r.status_code == 200
+    assert "BEGIN:VEVENT" in r.text
+    assert not pipeline.pool_broken()
+
+
+def test_ready_reports_broken_pool(client):
+    kill_workers()
+    assert client.get("/ready").status_code == 503
+    assert client.get("/ready").status_code == 200
+    paste = SAMPLE.replace("Ethan  Sifferman", "Ethan  Sifferman-Ready")
+    r = client.post("/parseSchedule", json={"scheduleText": paste, "onlyEnrolledCourses": True})
+    assert r.status_code == 200
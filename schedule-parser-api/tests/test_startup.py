@@ -0,0 +1,16 @@
+from benchmarks import importtime
+
+
+def test_nothing_lazy_loads_at_startup():
+    loaded = set(importtime.import_times()) | importtime.app_startup()[1]
+    assert [m for m in importtime.LAZY_MODULES if m in loaded] == []
+
+
+def test_app_startup_budget():
+    ms, _ = importtime.best_app_startup(runs=5)
+    assert ms <= importtime.APP_BUDGET_MS, f"import main + warm-up took {ms:.1f} ms"
+
+
+def test_import_budget():
+    best = min(importtime.import_times()["main"][1] for _ in range(3)) / 1000
+    assert best <= importtime.DEFAULT_BUDGET_MS, f"import main took {best:.1f} ms"
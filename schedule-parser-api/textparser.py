@@ -1,138 +1,315 @@
 import re
-from pprint import pprint
+
+from catalog import get_catalog
+from records import ClassInfo, Course, CourseMetadata
+
+# Bump whenever the parsed courses change for the same input (e.g. 2: a bare
+# "\r" ends a line); it is part of the parse cache key and every ETag.
+PARSER_VERSION = 2
+
 t = 'CSE 111 - Adv Programming\n\t\t\nStatus\tUnits\tGrading\tGrade\tDeadlines\nEnrolled\n5.00\nGraded\n \nAcademic Calendar Deadlines\nClass Nbr\tSection\tComponent\tDays & Times\tRoom\tInstructor\tStart/End Date\n30481\n01\nLecture\nMoWeFr 4:00PM - 5:05PM\nMedia Theater M110\nEthan  Sifferman\n01/06/2025 - 03/14/2025\n33007\n01E\nDiscussion\nWe 10:40AM - 11:45AM\nEngineer 2 194\nTo be Announced\n01/06/2025 - 03/14/2025\nCSE 115B - Software Design Pro\n\t\t\nStatus\tUnits\tGrading\tGrade\tGeneral Education\tDeadlines\nEnrolled\n5.00\nGraded\n \nPR-E\nAcademic Calendar Deadlines\nClass Nbr\tSection\tComponent\tDays & Times\tRoom\tInstructor\tStart/End Date\n30476\n01\nLecture\nTuTh 11:40AM - 1:15PM\nMerrill Acad 102\nRichard K Jullig\n01/06/2025 - 03/14/2025\nCSE 123A - Engr Design Proj I\n\t\t\nStatus\tUnits\tGrading\tGrade\tGeneral Education\tDeadlines\nDropped\n5.00\nGraded\n \nPR-E\nAcademic Calendar Deadlines\nClass Nbr\tSection\tComponent\tDays & Times\tRoom\tInstructor\tStart/End Date\n32151\n01\nLecture\nTuTh 5:20PM - 6:55PM\nSoc Sci 2 075\nDavid Charles Harrison\n01/06/2025 - 03/14/2025\nCSE 185E - Tech Writ Comp Engs\n\t\t\nStatus\tUnits\tGrading\tGrade\tDeadlines\nEnrolled\n5.00\nGraded\n \nAcademic Calendar Deadlines\nClass Nbr\tSection\tComponent\tDays & Times\tRoom\tInstructor\tStart/End Date\n32153\n01E\nDiscussion\nTu 7:10PM - 8:15PM\nMerrill Acad 132\nTo be Announced\n01/06/2025 - 03/14/2025\n32158\n01\nLecture\nTuTh 1:30PM - 3:05PM\nClassroomUnit 001\nGerald Bennett Moulds\n01/06/2025 - 03/14/2025'
 
+# Start of a course chunk: a line like "CSE 111 - Adv Programming".
+# Pattern: 2-5 uppercase letters, space, digits (optionally with letters), space, dash, space...
+COURSE_HEADER_RE = re.compile(r'^[A-Z]{2,5}\s+\d+\S*\s*-\s', re.MULTILINE)
+UNITS_RE = re.compile(r'^\d+(\.\d+)?$')
+GRADE_RE = re.compile(r'^[ABCDFW][+\-]?$|^P$|^NP$')
+
+# Browsers differ in what they put on the clipboard: "\r\n" or bare "\r" line
+# ends and non-breaking / narrow spaces (e.g. "MoWeFr\xa04:00PM") are mapped
+# to "\n" and " " ("\r\n" is replaced first, then any "\r" left).
+_PASTE_FIXES = str.maketrans({"\r": "\n", "\xa0": " ", "\u2007": " ", "\u202f": " "})
+_PASTE_FIX_RE = re.compile('[\r\xa0\u2007\u202f]')
+
+# ---- class table layouts ----
+# Courses always start with a header line and a status block; what differs
+# between pastes is how each class row of the table is laid out:
+#   stacked  one cell per line, 7 lines per class (the "My Class Schedule" copy)
+#   columns  one class per line, cells separated by 2+ spaces or tabs
+#   row      one class per line, single spaces; cells found by their shape
+
+# a line of the class table that starts a class: the class number
+CLASS_ROW_RE = re.compile(r'^\d{4,6}(?=\s|$)', re.MULTILINE)
+COLUMN_SPLIT_RE = re.compile(r'\t+|\s{2,}')
+ROW_HEAD_RE = re.compile(r'^(\d{4,6})\s+(\S+)\s+(\S+)\s+')
+ROW_DAYS_TIMES_RE = re.compile(
+    r'^(?:(?:Mo|Tu|We|Th|Fr|Sa|Su)+\s+\d{1,2}:\d{2}\s*[AP]M\s*-\s*\d{1,2}:\d{2}\s*[AP]M|TBA)(?=\s|$)')
+ROW_DATES_RE = re.compile(r'\s*(\d{2}/\d{2}/\d{4}\s*-\s*\d{2}/\d{2}/\d{4})$')
+ROW_TBA_INSTRUCTOR = "To be Announced"
+WORD_RE = re.compile(r'\S+')
+# how far into a paste sniff_layout looks for the first class row
+SNIFF_CHARS = 4096
+# fields of a parsed class the catalog may correct (a row's room/instructor
+# split is a guess); any other difference means it is not the catalog's class
+CATALOG_RESOLVED_FIELDS = {"room", "instructor"}
+# a paste that is only class numbers, e.g. "30481, 33007\n30476" (needs catalog.py)
+CLASS_LIST_RE = re.compile(r'\d{4,6}(?:[\s,;]+\d{4,6})*')
+CLASS_NBR_RE = re.compile(r'\d{4,6}')
+
 def parse_schedule_text(text: str, onlyenrolledcourses: bool):
     """
-    Parse the entire schedule text into a list of course dictionaries.
+    Parse the entire schedule text into a list of Course records
+    (records.courses_to_dicts gives the plain dict shape).
     """
-    # 1) Split the input into 'course chunks' by matching lines that look like "CSE 111 - Adv Programming"
-    #    Pattern: 2-5 uppercase letters, space, digits (optionally with letters), space, dash, space...
-    pattern = r'(?=^[A-Z]{2,5}\s+\d+\S*\s*-\s)'
-    course_chunks = re.split(pattern, text.strip(), flags=re.MULTILINE)
+    courses = iter_courses(text)
+    if onlyenrolledcourses:
+        return select_onlyenrolledcourses(courses)
+    return list(courses)
 
-    # Remove any empty strings
-    course_chunks = [chunk.strip() for chunk in course_chunks if chunk.strip()]
+def select_onlyenrolledcourses(courses):
+    return [c for c in courses if c.metadata.status == "Enrolled"]
 
-    # Parse each chunk
-    print("onlyenrolledcourses", onlyenrolledcourses)
-    courses = []
-    for chunk in course_chunks:
-        course = parse_course_chunk(chunk)
-        if course:
-            courses.append(course)
+def normalize_paste(text: str):
+    """
+    e.g. "MoWeFr\xa04:00PM\r\n" => "MoWeFr 4:00PM\n", "a\rb" => "a\nb"
+    """
+    if _PASTE_FIX_RE.search(text):
+        return text.replace("\r\n", "\n").translate(_PASTE_FIXES)
+    return text
 
-    if onlyenrolledcourses:
-        courses = select_onlyenrolledcourses(courses)
-    return courses
+def iter_courses(text: str, onlyenrolledcourses: bool = False, layout: str = None):
+    """
+    Walk the pasted text once, yielding each Course as soon as
+    the next course header (or the end of the text) is reached.
+    The class table layout is sniffed once from the start of the paste
+    unless given (see LAYOUTS).
+    """
+    text = normalize_paste(text).strip()
+    layout = layout or sniff_layout(text)
+    if layout == "class_numbers":
+        # no table to parse: every class comes from the catalog
+        yield from get_catalog().courses(CLASS_NBR_RE.findall(text))
+        return
+
+    parse_rows = LAYOUTS[layout][0]
+    chunk_start = 0
+    for m in COURSE_HEADER_RE.finditer(text):
+        header_start = m.start()
+        if header_start:
+            course = parse_course_chunk(text[chunk_start:header_start], parse_rows)
+            if course and (not onlyenrolledcourses or course.metadata.status == "Enrolled"):
+                yield course
+        chunk_start = header_start
 
-def select_onlyenrolledcourses(courses: list):
-    return [c for c in courses if c["metadata"]["status"] == "Enrolled"]
+    course = parse_course_chunk(text[chunk_start:], parse_rows)
+    if course and (not onlyenrolledcourses or course.metadata.status == "Enrolled"):
+        yield course
 
-def parse_course_chunk(chunk: str):
+def sniff_layout(text: str):
     """
-    Given the text for a single course, parse out:
+    Name of the LAYOUTS entry for a paste, decided by its first class row
+    (the first line starting with a class number) within SNIFF_CHARS;
+    "class_numbers" for a bare list of class numbers when a catalog is loaded.
+    """
+    if is_class_number_list(text) and get_catalog() is not None:
+        return "class_numbers"
+    head = text[:SNIFF_CHARS]
+    m = CLASS_ROW_RE.search(head)
+    if m is None:
+        return "stacked"
+    line_end = head.find("\n", m.start())
+    line = head[m.start():line_end if line_end != -1 else None].strip()
+    for name, (_, sniff) in LAYOUTS.items():
+        if sniff(line):
+            return name
+    return "stacked"
+
+def is_class_number_list(text: str):
+    # real pastes start with a course header, so only digit-first text is checked in full
+    return text[:1].isdigit() and CLASS_LIST_RE.fullmatch(text) is not None
+
+def parse_course_chunk(chunk: str, parse_rows=None):
+    """
+    Given the text for a single course, parse out a Course:
       - title
       - code (e.g. "CSE 111")
       - name (e.g. "Adv Programming")
-      - metadata: {status, units, grading, grade, general_education}
-      - classes: list of class dictionaries (class_nbr, section, component, days_times, room, instructor, start_end)
+      - metadata: CourseMetadata(status, units, grading, grade, general_education)
+      - classes: tuple of ClassInfo (class_nbr, section, component, days_times, room, instructor, start_end),
+        read by parse_rows (a LAYOUTS handler; default stacked)
     """
-    lines = [ln.strip() for ln in chunk.splitlines() if ln.strip()]
+    # Every line is stripped exactly once; blank lines are dropped in the same step.
+    lines = [ln for ln in map(str.strip, chunk.splitlines()) if ln]
     if not lines:
         return None
 
     # 1) First line => course title (e.g. "CSE 111 - Adv Programming")
     title_line = lines[0]
-    course_title = title_line
     # Split out code vs. name if you want them separate
     if " - " in title_line:
         code_part, name_part = title_line.split(" - ", 1)
     else:
         code_part, name_part = title_line, ""  # fallback if no " - "
 
-    # Initialize the course dict
-    course = {
-        "title": course_title,
-        "code": code_part,
-        "name": name_part,
-        "metadata": {
-            "status": None,
-            "units": None,
-            "grading": None,
-            "grade": None,
-            "general_education": None,
-        },
-        "classes": []
-    }
+    status = units = grading = grade = general_education = None
+    classes = []
 
     # 2) Read lines to fill in metadata until we see "Academic Calendar Deadlines"
+    #    (or the class table header, when a paste has no deadlines line)
+    n = len(lines)
     idx = 1
-    while idx < len(lines):
+    while idx < n:
         line = lines[idx]
+        if line.startswith("Class Nbr"):
+            break
+        idx += 1
         if "Academic Calendar Deadlines" in line:
-            idx += 1  # move past that line
             break
 
         # Check if line is "Enrolled"/"Dropped"
-        if line in ["Enrolled", "Dropped"]:
-            course["metadata"]["status"] = line
+        if line == "Enrolled" or line == "Dropped":
+            status = line
         # If it's numeric, likely units
-        elif re.match(r'^\d+(\.\d+)?$', line):
-            course["metadata"]["units"] = line
+        elif UNITS_RE.match(line):
+            units = line
         # "Graded" or "P/NP"
         elif "Graded" in line or "P/NP" in line:
-            course["metadata"]["grading"] = line
+            grading = line
         # A letter grade like A-, B+, etc.
-        elif re.match(r'^[ABCDFW][+\-]?$|^P$|^NP$', line):
-            course["metadata"]["grade"] = line
+        elif GRADE_RE.match(line):
+            grade = line
         # If it starts with "PR-" (e.g. "PR-E")
-        elif re.match(r'^PR-', line):
-            course["metadata"]["general_education"] = line
+        elif line.startswith("PR-"):
+            general_education = line
 
-        idx += 1
+    # 3) Parse the class table: Class Nbr, Section, Component, Days & Times, Room, Instructor, Start/End Date
+    classes = resolve_classes((parse_rows or parse_stacked_rows)(lines, idx))
+
+    return Course(
+        title=title_line,
+        code=code_part,
+        name=name_part,
+        metadata=CourseMetadata(status, units, grading, grade, general_education),
+        classes=tuple(classes),
+    )
 
-    # 3) Parse the class table lines (7 lines per class)
-    #    Format for each class:
-    #      (1) Class Nbr
-    #      (2) Section
-    #      (3) Component
-    #      (4) Days & Times
-    #      (5) Room
-    #      (6) Instructor
-    #      (7) Start/End Date
-
-    while idx < len(lines):
+def resolve_classes(classes):
+    """
+    With a catalog (CATALOG_PATH), every parsed class the catalog has with the
+    same section, component, days/times and dates, i.e. Catalog.validate finds
+    nothing but CATALOG_RESOLVED_FIELDS differing, is replaced by the catalog's
+    entry; whatever the layout, the same class comes out the same.
+    """
+    catalog = get_catalog()
+    if catalog is None:
+        return classes
+    resolved = []
+    for cls in classes:
+        mismatched = catalog.validate(cls)
+        if mismatched is not None and set(mismatched) <= CATALOG_RESOLVED_FIELDS:
+            cls = catalog.class_info(cls.class_nbr)
+        resolved.append(cls)
+    return resolved
+
+def parse_stacked_rows(lines, idx):
+    """
+    7 lines per class, e.g. "30481", "01", "Lecture", "MoWeFr 4:00PM - 5:05PM", ...
+    """
+    classes = []
+    n = len(lines)
+    while idx < n:
         # If the next line *is* the table header, skip it
         if "Class Nbr" in lines[idx]:
             idx += 1
             continue
 
         # If fewer than 7 lines remain, we can't parse a full class => break
-        if (idx + 6) >= len(lines):
+        if idx + 7 > n:
             break
 
-        class_nbr    = lines[idx].strip()
-        section      = lines[idx+1].strip()
-        component    = lines[idx+2].strip()
-        days_times   = lines[idx+3].strip()
-        room         = lines[idx+4].strip()
-        instructor   = lines[idx+5].strip()
-        start_end    = lines[idx+6].strip()
-
+        classes.append(ClassInfo(*lines[idx:idx + 7]))
         idx += 7  # move to next potential class
+    return classes
+
+def parse_column_rows(lines, idx):
+    """
+    One class per line, cells separated by 2+ spaces or tabs, e.g.
+    "30481    01    Lecture    MoWeFr 4:00PM - 5:05PM    Media Theater M110    ..."
+    Rows where two cells ran together (or a name has a double space)
+    fall back to parse_class_row.
+    """
+    classes = []
+    for line in lines[idx:]:
+        if "Class Nbr" in line:
+            continue
+        cells = COLUMN_SPLIT_RE.split(line)
+        if len(cells) == 7 and ROW_DAYS_TIMES_RE.fullmatch(cells[3]) and ROW_DATES_RE.fullmatch(cells[6]):
+            classes.append(ClassInfo(*cells))
+        else:
+            cls = parse_class_row(line)
+            if cls:
+                classes.append(cls)
+    return classes
+
+def parse_single_space_rows(lines, idx):
+    classes = []
+    for line in lines[idx:]:
+        cls = parse_class_row(line)
+        if cls:
+            classes.append(cls)
+    return classes
+
+def parse_class_row(line: str):
+    """
+    One class from a row with arbitrary spacing, e.g.
+    "30481 01 Lecture MoWeFr 4:00PM - 5:05PM Media Theater M110 Ethan Sifferman 01/06/2025 - 03/14/2025"
+    Number, section and component are the first three words, the dates come
+    off the end and the days/times off the front of the rest; what is left is
+    "<room> <instructor>", split before the trailing words without digits
+    (at most three, e.g. "Gerald Bennett Moulds") or at "To be Announced".
+    => ClassInfo, or None for lines that are not class rows.
+    """
+    head = ROW_HEAD_RE.match(line)
+    if head is None:
+        return None
+    class_nbr, section, component = head.groups()
+    rest = line[head.end():]
+
+    start_end = ""
+    dates = ROW_DATES_RE.search(rest)
+    if dates:
+        start_end = dates.group(1)
+        rest = rest[:dates.start()]
+
+    days = ROW_DAYS_TIMES_RE.match(rest)
+    if days:
+        days_times = days.group(0)
+        rest = rest[days.end():].strip()
+    else:
+        days_times, rest = rest.strip(), ""
+
+    if ROW_TBA_INSTRUCTOR in rest:
+        room = rest[:rest.index(ROW_TBA_INSTRUCTOR)].strip()
+        instructor = ROW_TBA_INSTRUCTOR
+    else:
+        words = list(WORD_RE.finditer(rest))
+        name_len = 0
+        while name_len < min(3, len(words)) and not any(ch.isdigit() for ch in words[-1 - name_len].group()):
+            name_len += 1
+        # a room always has something in it; "TBA" rooms are a single word
+        if name_len == len(words) and words:
+            name_len -= 1
+        # slice rather than re-join, so "Ethan  Sifferman" keeps its spacing
+        split_at = words[-name_len].start() if name_len else len(rest)
+        room = rest[:split_at].strip()
+        instructor = rest[split_at:].strip()
+
+    return ClassInfo(class_nbr, section, component, days_times, room, instructor, start_end)
 
-        class_info = {
-            "class_nbr": class_nbr,
-            "section": section,
-            "component": component,
-            "days_times": days_times,
-            "room": room,
-            "instructor": instructor,
-            "start_end": start_end
-        }
+def _is_stacked_row(line):
+    # the class number is alone on its line
+    return line.isdigit()
 
-        course["classes"].append(class_info)
+def _is_column_row(line):
+    return len(COLUMN_SPLIT_RE.split(line)) >= 5
 
-    return course
+def _is_single_space_row(line):
+    return True
 
+# name => (rows handler(lines, start index) -> [ClassInfo], sniff(first class row) -> bool),
+# sniffed in this order; the last one accepts anything.
+LAYOUTS = {
+    "stacked": (parse_stacked_rows, _is_stacked_row),
+    "columns": (parse_column_rows, _is_column_row),
+    "row": (parse_single_space_rows, _is_single_space_row),
+}